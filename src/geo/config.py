@@ -8,6 +8,39 @@ logger = getLogger(__name__)
 DEBUG_ENV = "DEBUG"
 FDSN_BASE_ENV = "FDSN_BASE"
 HPS_ST3D_EXEC_ENV = "HPS_ST3D_EXEC"
+DB_BATCH_SIZE_ENV = "DB_BATCH_SIZE"
+HTTP_CONNECT_TIMEOUT_ENV = "HTTP_CONNECT_TIMEOUT"
+HTTP_READ_TIMEOUT_ENV = "HTTP_READ_TIMEOUT"
+HTTP_MAX_CONNECTIONS_ENV = "HTTP_MAX_CONNECTIONS"
+HTTP_MAX_KEEPALIVE_ENV = "HTTP_MAX_KEEPALIVE"
+HTTP_KEEPALIVE_EXPIRY_ENV = "HTTP_KEEPALIVE_EXPIRY"
+HTTP2_ENV = "HTTP2"
+FDSN_CACHE_EVENT_TTL_ENV = "FDSN_CACHE_EVENT_TTL"
+FDSN_CACHE_STATION_TTL_ENV = "FDSN_CACHE_STATION_TTL"
+FDSN_CACHE_MAX_SIZE_ENV = "FDSN_CACHE_MAX_SIZE"
+FDSN_EVENT_WINDOW_ENV = "FDSN_EVENT_WINDOW"
+FDSN_EVENT_MIN_WINDOW_ENV = "FDSN_EVENT_MIN_WINDOW"
+FDSN_CONCURRENCY_ENV = "FDSN_CONCURRENCY"
+QUAKEML_PARSER_ENV = "QUAKEML_PARSER"
+PROC_POOL_SIZE_ENV = "PROC_POOL_SIZE"
+PROC_POOL_MAX_TASKS_ENV = "PROC_POOL_MAX_TASKS"
+STATION_INVENTORY_TTL_ENV = "STATION_INVENTORY_TTL"
+FDSN_RETRY_ATTEMPTS_ENV = "FDSN_RETRY_ATTEMPTS"
+FDSN_RETRY_BASE_DELAY_ENV = "FDSN_RETRY_BASE_DELAY"
+FDSN_RETRY_MAX_DELAY_ENV = "FDSN_RETRY_MAX_DELAY"
+FDSN_FETCH_DEADLINE_ENV = "FDSN_FETCH_DEADLINE"
+FDSN_HEDGE_ENV = "FDSN_HEDGE"
+FDSN_SPILL_SIZE_ENV = "FDSN_SPILL_SIZE"
+FDSN_PIPELINE_DEPTH_ENV = "FDSN_PIPELINE_DEPTH"
+RELIEF_MARGIN_ENV = "RELIEF_MARGIN"
+START_MODEL_CACHE_MAX_SIZE_ENV = "START_MODEL_CACHE_MAX_SIZE"
+SOLVER_TIMEOUT_ENV = "SOLVER_TIMEOUT"
+SOLVER_CORES_ENV = "SOLVER_CORES"
+SOLVER_LAUNCHER_ENV = "SOLVER_LAUNCHER"
+SOLVER_MIN_RANKS_ENV = "SOLVER_MIN_RANKS"
+SOLVER_MAX_RANKS_ENV = "SOLVER_MAX_RANKS"
+SOLVER_COST_PER_RANK_ENV = "SOLVER_COST_PER_RANK"
+SWEEP_MAX_VARIANTS_ENV = "SWEEP_MAX_VARIANTS"
 
 
 class ConfigParseError(ValueError):
@@ -19,6 +52,39 @@ class Config:
     DEBUG: bool
     FDSN_BASE: str
     HPS_ST3D_EXEC: str
+    DB_BATCH_SIZE: int
+    HTTP_CONNECT_TIMEOUT: int
+    HTTP_READ_TIMEOUT: int
+    HTTP_MAX_CONNECTIONS: int
+    HTTP_MAX_KEEPALIVE: int
+    HTTP_KEEPALIVE_EXPIRY: int
+    HTTP2: bool
+    FDSN_CACHE_EVENT_TTL: int
+    FDSN_CACHE_STATION_TTL: int
+    FDSN_CACHE_MAX_SIZE: int
+    FDSN_EVENT_WINDOW: int
+    FDSN_EVENT_MIN_WINDOW: int
+    FDSN_CONCURRENCY: int
+    QUAKEML_PARSER: str
+    PROC_POOL_SIZE: int
+    PROC_POOL_MAX_TASKS: int
+    STATION_INVENTORY_TTL: int
+    FDSN_RETRY_ATTEMPTS: int
+    FDSN_RETRY_BASE_DELAY: float
+    FDSN_RETRY_MAX_DELAY: float
+    FDSN_FETCH_DEADLINE: int
+    FDSN_HEDGE: bool
+    FDSN_SPILL_SIZE: int
+    FDSN_PIPELINE_DEPTH: int
+    RELIEF_MARGIN: float
+    START_MODEL_CACHE_MAX_SIZE: int
+    SOLVER_TIMEOUT: int
+    SOLVER_CORES: int
+    SOLVER_LAUNCHER: str
+    SOLVER_MIN_RANKS: int
+    SOLVER_MAX_RANKS: int
+    SOLVER_COST_PER_RANK: int
+    SWEEP_MAX_VARIANTS: int
 
 
 def to_bool(value) -> bool:
@@ -33,14 +99,26 @@ def get_str_env(key: str, optional: bool = False) -> str:
     return val
 
 
-def get_int_env(key: str, optional: bool = False) -> int:
+def get_int_env(key: str, optional: bool = False, default: int = None) -> int:
     val = get_str_env(key, optional)
+    if not val:
+        return default
     try:
         return int(val)
     except ValueError:
         raise ConfigParseError("Value %s must be integer", val)
 
 
+def get_float_env(key: str, optional: bool = False, default: float = None) -> float:
+    val = get_str_env(key, optional)
+    if not val:
+        return default
+    try:
+        return float(val)
+    except ValueError:
+        raise ConfigParseError("Value %s must be float", val)
+
+
 def load_env_config(env_file: str | os.PathLike = None) -> Config:
     if not env_file:
         env_file = ".env"
@@ -55,5 +133,38 @@ def load_env_config(env_file: str | os.PathLike = None) -> Config:
     return Config(
         DEBUG=to_bool(get_str_env(DEBUG_ENV)),
         FDSN_BASE=get_str_env(FDSN_BASE_ENV),
-        HPS_ST3D_EXEC=get_str_env(HPS_ST3D_EXEC_ENV)
+        HPS_ST3D_EXEC=get_str_env(HPS_ST3D_EXEC_ENV),
+        DB_BATCH_SIZE=get_int_env(DB_BATCH_SIZE_ENV, optional=True, default=5000),
+        HTTP_CONNECT_TIMEOUT=get_int_env(HTTP_CONNECT_TIMEOUT_ENV, optional=True, default=10),
+        HTTP_READ_TIMEOUT=get_int_env(HTTP_READ_TIMEOUT_ENV, optional=True, default=600),
+        HTTP_MAX_CONNECTIONS=get_int_env(HTTP_MAX_CONNECTIONS_ENV, optional=True, default=10),
+        HTTP_MAX_KEEPALIVE=get_int_env(HTTP_MAX_KEEPALIVE_ENV, optional=True, default=5),
+        HTTP_KEEPALIVE_EXPIRY=get_int_env(HTTP_KEEPALIVE_EXPIRY_ENV, optional=True, default=30),
+        HTTP2=to_bool(get_str_env(HTTP2_ENV, optional=True)),
+        FDSN_CACHE_EVENT_TTL=get_int_env(FDSN_CACHE_EVENT_TTL_ENV, optional=True, default=3600),
+        FDSN_CACHE_STATION_TTL=get_int_env(FDSN_CACHE_STATION_TTL_ENV, optional=True, default=7 * 24 * 3600),
+        FDSN_CACHE_MAX_SIZE=get_int_env(FDSN_CACHE_MAX_SIZE_ENV, optional=True, default=1024 ** 3),
+        FDSN_EVENT_WINDOW=get_int_env(FDSN_EVENT_WINDOW_ENV, optional=True, default=30 * 24 * 3600),
+        FDSN_EVENT_MIN_WINDOW=get_int_env(FDSN_EVENT_MIN_WINDOW_ENV, optional=True, default=3600),
+        FDSN_CONCURRENCY=get_int_env(FDSN_CONCURRENCY_ENV, optional=True, default=4),
+        QUAKEML_PARSER=get_str_env(QUAKEML_PARSER_ENV, optional=True) or "stream",
+        PROC_POOL_SIZE=get_int_env(PROC_POOL_SIZE_ENV, optional=True, default=0),
+        PROC_POOL_MAX_TASKS=get_int_env(PROC_POOL_MAX_TASKS_ENV, optional=True, default=100),
+        STATION_INVENTORY_TTL=get_int_env(STATION_INVENTORY_TTL_ENV, optional=True, default=24 * 3600),
+        FDSN_RETRY_ATTEMPTS=get_int_env(FDSN_RETRY_ATTEMPTS_ENV, optional=True, default=3),
+        FDSN_RETRY_BASE_DELAY=get_float_env(FDSN_RETRY_BASE_DELAY_ENV, optional=True, default=1.0),
+        FDSN_RETRY_MAX_DELAY=get_float_env(FDSN_RETRY_MAX_DELAY_ENV, optional=True, default=30.0),
+        FDSN_FETCH_DEADLINE=get_int_env(FDSN_FETCH_DEADLINE_ENV, optional=True, default=1800),
+        FDSN_HEDGE=to_bool(get_str_env(FDSN_HEDGE_ENV, optional=True)),
+        FDSN_SPILL_SIZE=get_int_env(FDSN_SPILL_SIZE_ENV, optional=True, default=16 * 1024 ** 2),
+        FDSN_PIPELINE_DEPTH=get_int_env(FDSN_PIPELINE_DEPTH_ENV, optional=True, default=2),
+        RELIEF_MARGIN=get_float_env(RELIEF_MARGIN_ENV, optional=True, default=0.1),
+        START_MODEL_CACHE_MAX_SIZE=get_int_env(START_MODEL_CACHE_MAX_SIZE_ENV, optional=True, default=1024 ** 3),
+        SOLVER_TIMEOUT=get_int_env(SOLVER_TIMEOUT_ENV, optional=True, default=24 * 3600),
+        SOLVER_CORES=get_int_env(SOLVER_CORES_ENV, optional=True, default=0),
+        SOLVER_LAUNCHER=get_str_env(SOLVER_LAUNCHER_ENV, optional=True) or "",
+        SOLVER_MIN_RANKS=get_int_env(SOLVER_MIN_RANKS_ENV, optional=True, default=1),
+        SOLVER_MAX_RANKS=get_int_env(SOLVER_MAX_RANKS_ENV, optional=True, default=0),
+        SOLVER_COST_PER_RANK=get_int_env(SOLVER_COST_PER_RANK_ENV, optional=True, default=20_000_000),
+        SWEEP_MAX_VARIANTS=get_int_env(SWEEP_MAX_VARIANTS_ENV, optional=True, default=64)
     )
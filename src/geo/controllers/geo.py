@@ -1,3 +1,5 @@
+from uuid import UUID
+
 from fastapi import APIRouter, Depends
 from fastapi import status as http_status
 from starlette.responses import StreamingResponse
@@ -5,7 +7,7 @@ from starlette.responses import StreamingResponse
 from geo.models.schemas import TaskID
 from geo.services import ServiceFactory
 from geo.services.di import get_services
-from geo.views import SeisDataResponse, TomographyResponse, EventsResponse, StationsResponse
+from geo.views import SeisDataResponse, TomographyResponse, EventsResponse, StationsResponse, SweepResponse
 
 geo_router = APIRouter(prefix="/geo", tags=["Geo"])
 
@@ -34,6 +36,18 @@ async def tomography(
     return TomographyResponse(content=await services.geo.tomography(task_id=task_id))
 
 
+@geo_router.get("/sweep/{sweep_id}", response_model=SweepResponse, status_code=http_status.HTTP_200_OK)
+async def sweep(
+        sweep_id: UUID,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Состояние вариантов перебора параметров и сводка невязок
+
+    """
+    return SweepResponse(content=await services.geo.sweep(sweep_id=sweep_id))
+
+
 @geo_router.get("/{task_id}/seisdata/events", response_model=EventsResponse, status_code=http_status.HTTP_200_OK)
 async def event_table(
         task_id: TaskID,
@@ -2,10 +2,12 @@ from fastapi import APIRouter, Depends
 from fastapi import status as http_status
 
 from geo.models.schemas import TaskID
-from geo.models.schemas.seisdata import SeisData
+from geo.models.schemas.seisdata import SeisData, SeisDataRefresh
+from geo.models.schemas.sweep import TomographySweep
 from geo.models.schemas.tomography import Tomography
 from geo.services import ServiceFactory
 from geo.services.di import get_services
+from geo.views import SweepResponse
 
 proc_router = APIRouter(prefix="/proc", tags=["Process"])
 
@@ -23,6 +25,19 @@ async def data_proc(
     await services.geo.seisdata_proc(task_id=task_id, data=data)
 
 
+@proc_router.patch("/data/{task_id}", response_model=None, status_code=http_status.HTTP_202_ACCEPTED)
+async def data_refresh(
+        task_id: TaskID,
+        data: SeisDataRefresh,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Дозагрузка данных задачи до нового времени окончания
+
+    """
+    await services.geo.seisdata_refresh(task_id=task_id, data=data)
+
+
 @proc_router.post("/tomography/{task_id}", response_model=None, status_code=http_status.HTTP_202_ACCEPTED)
 async def tomography_proc(
         task_id: TaskID,
@@ -37,3 +52,28 @@ async def tomography_proc(
         task_id=task_id,
         data=data,
     )
+
+
+@proc_router.delete("/tomography/{task_id}", response_model=None, status_code=http_status.HTTP_202_ACCEPTED)
+async def tomography_cancel(
+        task_id: TaskID,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Отмена процесса томографии
+
+    """
+    await services.geo.tomography_cancel(task_id=task_id)
+
+
+@proc_router.post("/tomography/{task_id}/sweep", response_model=SweepResponse, status_code=http_status.HTTP_202_ACCEPTED)
+async def tomography_sweep(
+        task_id: TaskID,
+        data: TomographySweep,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Запуск перебора параметров томографии по данным задачи
+
+    """
+    return SweepResponse(content=await services.geo.tomography_sweep(task_id=task_id, data=data))
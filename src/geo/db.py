@@ -1,5 +1,9 @@
+import logging
+
+from sqlalchemy import Column, Connection, inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, AsyncEngine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.schema import CreateColumn
 
 
 def create_sqlite_async_session(
@@ -16,4 +20,29 @@ def create_sqlite_async_session(
     return engine, async_sessionmaker(engine, expire_on_commit=False)
 
 
+def add_columns(connection: Connection, columns: list[Column]) -> None:
+    """
+    Добавляет в существующие таблицы колонки, появившиеся после их создания
+
+    create_all создает только отсутствующие таблицы и не меняет существующие,
+    поэтому новые колонки добавляются через ALTER TABLE. Уже добавленные
+    колонки пропускаются, повторный запуск ничего не меняет.
+
+    :param connection: соединение с БД
+    :param columns: колонки таблиц, допускающие NULL или с server_default
+    """
+    inspector = inspect(connection)
+    for column in columns:
+        table = column.table
+        if column.name in {item["name"] for item in inspector.get_columns(table.name)}:
+            continue
+        ddl = CreateColumn(column).compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+        for index in table.indexes:
+            if column.name in index.columns:
+                index.create(connection, checkfirst=True)
+        inspector.clear_cache()
+        logging.info(f"В таблицу {table.name} добавлена колонка {column.name}")
+
+
 Base = declarative_base()
@@ -4,8 +4,9 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI
 
 from geo.config import Config
-from geo.db import create_sqlite_async_session
+from geo.db import add_columns, create_sqlite_async_session
 from geo.models import tables
+from geo.utils.pool import create_process_pool
 from geo.utils.queue import Queue
 
 from geo.services import data_proc
@@ -22,9 +23,10 @@ async def init_db(app: FastAPI, *, echo: bool = False) -> None:
     async with engine.begin() as conn:
         # await conn.run_sync(tables.Base.metadata.drop_all)
         await conn.run_sync(tables.Base.metadata.create_all)
+        await conn.run_sync(add_columns, tables.ADDED_COLUMNS)
 
 
-def start_workers(app: FastAPI, fdsn_base: str, executable: str):
+def start_workers(app: FastAPI, config: Config):
     scheduler = AsyncIOScheduler()
     scheduler.add_job(
         func=data_proc.worker,
@@ -34,7 +36,10 @@ def start_workers(app: FastAPI, fdsn_base: str, executable: str):
             getattr(app, "state").data_queue,
             getattr(app, "state").db_session,
             getattr(app, "state").http_client,
-            fdsn_base
+            getattr(app, "state").fdsn_cache,
+            getattr(app, "state").process_pool,
+            getattr(app, "state").pipeline_stats,
+            config
         ),
     )
     scheduler.add_job(
@@ -45,7 +50,25 @@ def start_workers(app: FastAPI, fdsn_base: str, executable: str):
             getattr(app, "state").tomography_queue,
             getattr(app, "state").db_session,
             getattr(app, "state").storage,
-            executable
+            getattr(app, "state").start_model_cache,
+            getattr(app, "state").process_pool,
+            getattr(app, "state").solver,
+            config
+        ),
+    )
+
+    scheduler.add_job(
+        func=tomography_proc.sweep_worker,
+        trigger="interval",
+        seconds=5,
+        args=(
+            getattr(app, "state").sweep_queue,
+            getattr(app, "state").db_session,
+            getattr(app, "state").storage,
+            getattr(app, "state").start_model_cache,
+            getattr(app, "state").process_pool,
+            getattr(app, "state").solver,
+            config
         ),
     )
 
@@ -65,9 +88,20 @@ class LifeSpan:
         logging.debug("Выполнение FastAPI startup event handler.")
         getattr(self._app, "state").data_queue = Queue()
         getattr(self._app, "state").tomography_queue = Queue()
+        getattr(self._app, "state").sweep_queue = Queue()
         await init_db(self._app, echo=self._config.DEBUG)
-        start_workers(self._app, self._config.FDSN_BASE, self._config.HPS_ST3D_EXEC)
+        await getattr(self._app, "state").http_client.start()
+        getattr(self._app, "state").process_pool = create_process_pool(
+            processes=self._config.PROC_POOL_SIZE,
+            max_tasks_per_child=self._config.PROC_POOL_MAX_TASKS
+        )
+        start_workers(self._app, self._config)
         logging.info("FastAPI Успешно запущен.")
 
     async def shutdown_handler(self) -> None:
         logging.debug("Выполнение FastAPI shutdown event handler.")
+        await getattr(self._app, "state").solver.close()
+        await getattr(self._app, "state").http_client.close()
+        process_pool = getattr(self._app, "state").process_pool
+        process_pool.close()
+        await process_pool.join()
@@ -1,5 +1,5 @@
 import logging
-from datetime import timedelta
+import os
 
 from fastapi import FastAPI, APIRouter
 from fastapi.exceptions import RequestValidationError
@@ -16,9 +16,13 @@ from geo.exceptions import (
     handle_pydantic_error
 )
 from geo.lifespan import LifeSpan
+from geo.services.cache import FDSNCache, StartModelCache
 from geo.services.storage import FileStorage
+from geo.services.tomography_proc.solver import SolverManager
 from geo.utils import custom_openapi
 from geo.utils.http import HttpProcessor
+from geo.utils.pipeline import PipelineStats
+from geo.utils.retry import RetryPolicy
 
 
 class ApplicationFactory:
@@ -38,9 +42,41 @@ class ApplicationFactory:
         app.openapi = lambda: custom_openapi(app)
         getattr(app, "state").config = config
         getattr(app, "state").storage = FileStorage("./storage")
+        getattr(app, "state").fdsn_cache = FDSNCache(
+            getattr(app, "state").storage,
+            ttl={
+                "event": config.FDSN_CACHE_EVENT_TTL,
+                "station": config.FDSN_CACHE_STATION_TTL,
+            },
+            max_size=config.FDSN_CACHE_MAX_SIZE
+        )
+        getattr(app, "state").start_model_cache = StartModelCache(
+            getattr(app, "state").storage,
+            max_size=config.START_MODEL_CACHE_MAX_SIZE
+        )
+        getattr(app, "state").solver = SolverManager(
+            cores=list(range(config.SOLVER_CORES)) if config.SOLVER_CORES else sorted(os.sched_getaffinity(0)),
+            launcher=config.SOLVER_LAUNCHER,
+            min_ranks=config.SOLVER_MIN_RANKS,
+            max_ranks=config.SOLVER_MAX_RANKS,
+            cost_per_rank=config.SOLVER_COST_PER_RANK
+        )
+        getattr(app, "state").pipeline_stats = PipelineStats(["fetch", "parse", "write"])
         getattr(app, "state").http_client = HttpProcessor(
-            timeout=timedelta(minutes=10).seconds,
+            connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+            read_timeout=config.HTTP_READ_TIMEOUT,
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+            http2=config.HTTP2,
             user_agent="aiohttp/3.7.4 (compatible; Geo/0.1.0)",
+            retry_policy=RetryPolicy(
+                attempts=config.FDSN_RETRY_ATTEMPTS,
+                base_delay=config.FDSN_RETRY_BASE_DELAY,
+                max_delay=config.FDSN_RETRY_MAX_DELAY,
+                deadline=config.FDSN_FETCH_DEADLINE or None,
+                hedge=config.FDSN_HEDGE,
+            )
         )
         if not config.DEBUG:
             logging.getLogger("apscheduler").setLevel(logging.INFO)
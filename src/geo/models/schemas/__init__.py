@@ -8,9 +8,15 @@ from .task import TaskState
 from .task import TaskStep
 
 from .seisdata import SeisData
+from .seisdata import SeisDataRefresh
 from .tomography import Tomography
+from .tomography import TomographyResult
 from .detection import Detection
 from .detection import Phase
 
 from .event import Event
 from .station import Station
+
+from .sweep import Sweep
+from .sweep import SweepVariant
+from .sweep import TomographySweep
@@ -1,16 +1,29 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 
 class SeisData(BaseModel):
     start_time: datetime
     end_time: datetime
-    network: str
+    network: list[str]
     min_latitude: float | None = None
     max_latitude: float | None = None
     min_longitude: float | None = None
     max_longitude: float | None = None
 
+    @field_validator('network', mode='before')
+    def network_must_be_valid(cls, value):
+        if isinstance(value, str):
+            value = value.split(",")
+        networks = list(dict.fromkeys(str(network).strip() for network in value if str(network).strip()))
+        if not networks:
+            raise ValueError('network должен содержать хотя бы одну сеть')
+        return networks
+
     class Config:
         from_attributes = True
+
+
+class SeisDataRefresh(BaseModel):
+    end_time: datetime | None = None
@@ -0,0 +1,76 @@
+import itertools
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from pydantic import BaseModel, field_validator
+
+from geo.models.schemas.task import TaskID, TaskState
+from geo.models.schemas.tomography import Tomography
+
+# Параметры, которые меняют только атрибуты входного файла
+SWEEP_PARAMETERS = (
+    "iter_max",
+    "lin_sys_LSQR_iter_max",
+    "mat_damping_P",
+    "mat_damping_P4V",
+    "mat_damping_S",
+    "mat_damping_S4V",
+    "mat_damping_HP",
+    "mat_damping_HP4V",
+    "mat_damping_HS",
+    "mat_damping_HS4V",
+    "mat_damping_VP",
+    "mat_damping_VP4V",
+    "mat_damping_VS",
+    "mat_damping_VS4V",
+    "v_limits_p",
+    "v_limits_s",
+    "grid_step",
+)
+
+
+class TomographySweep(BaseModel):
+    base: Tomography
+    parameters: dict[str, list[Any]]
+
+    @field_validator('parameters')
+    def parameters_must_be_valid(cls, value):
+        if not value:
+            raise ValueError('parameters должен содержать хотя бы один параметр')
+        unknown = sorted(set(value) - set(SWEEP_PARAMETERS))
+        if unknown:
+            raise ValueError(f'Параметры {unknown} нельзя перебирать, допустимы {list(SWEEP_PARAMETERS)}')
+        for name, values in value.items():
+            if not values:
+                raise ValueError(f'Список значений {name} пуст')
+        return value
+
+    def variants(self) -> list[dict[str, Any]]:
+        """
+        Декартово произведение значений параметров
+
+        :return: [{параметр: значение}, ...]
+        """
+        names = list(self.parameters)
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*(self.parameters[name] for name in names))
+        ]
+
+
+class SweepVariant(BaseModel):
+    task_id: TaskID
+    parameters: dict[str, Any]
+    state: TaskState
+    progress: float | None = None
+    cached_from: TaskID | None = None
+    residuals: dict[str, float | int | None] | None = None
+
+
+class Sweep(BaseModel):
+    id: UUID
+    task_id: TaskID
+    parameters: dict[str, list[Any]]
+    created_at: datetime | None = None
+    variants: list[SweepVariant] = []
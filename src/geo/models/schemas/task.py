@@ -26,6 +26,7 @@ class Task(BaseModel):
     id: TaskID
     state: TaskState
     step: TaskStep | None
+    progress: float | None = None
 
     created_at: datetime
     completed_in: datetime | None
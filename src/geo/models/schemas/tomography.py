@@ -1,5 +1,7 @@
 from pydantic import BaseModel, field_validator
 
+from geo.models.schemas.task import TaskID
+
 
 class Tomography(BaseModel):
     iter_max: int
@@ -48,3 +50,8 @@ class Tomography(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TomographyResult(Tomography):
+    input_hash: str | None = None
+    cached_from: TaskID | None = None
@@ -6,3 +6,14 @@ from .event import Event
 from .seisdata import SeisData
 from .detection import Detection
 from .tomography import Tomography
+from .station_inventory import StationInventory
+from .sweep import Sweep, SweepVariant
+
+# Колонки, добавленные в существующие таблицы: create_all их не создает,
+# при запуске они добавляются через ALTER TABLE (geo.db.add_columns)
+ADDED_COLUMNS = [
+    Event.__table__.c.public_id,
+    Task.__table__.c.progress,
+    Tomography.__table__.c.input_hash,
+    Tomography.__table__.c.cached_from,
+]
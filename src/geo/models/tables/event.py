@@ -14,6 +14,7 @@ class Event(Base):
     time = Column(DateTime(timezone=True), nullable=False)
     network = Column(VARCHAR(32), nullable=False)
     event = Column(VARCHAR(32), nullable=False)
+    public_id = Column(VARCHAR(255), nullable=True)
     magnitude = Column(DOUBLE(), nullable=False)
     x = Column(DOUBLE(), nullable=False)
     y = Column(DOUBLE(), nullable=False)
@@ -0,0 +1,22 @@
+import uuid
+
+from sqlalchemy import Column, VARCHAR, DOUBLE, DateTime
+
+from geo.db import Base
+from geo.utils.sa import GUID
+
+
+class StationInventory(Base):
+    __tablename__ = "station_inventory"
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    network = Column(VARCHAR(32), nullable=False, index=True)
+    station = Column(VARCHAR(32), nullable=False)
+    x = Column(DOUBLE(), nullable=False)
+    y = Column(DOUBLE(), nullable=False)
+    z = Column(DOUBLE(), nullable=False)
+
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.id}>'
@@ -0,0 +1,40 @@
+import uuid
+
+from sqlalchemy import Column, ForeignKey, PickleType, DateTime, func
+from sqlalchemy.orm import relationship
+
+from geo.db import Base
+from geo.utils.sa import GUID
+
+
+class Sweep(Base):
+    __tablename__ = "sweeps"
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    base = Column(PickleType, nullable=False)
+    parameters = Column(PickleType, nullable=False)
+
+    task_id = Column(GUID(), ForeignKey("tasks.id", ondelete="cascade"), nullable=False)
+    variants = relationship("SweepVariant", back_populates="sweep")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.id}>'
+
+
+class SweepVariant(Base):
+    __tablename__ = "sweep_variants"
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    parameters = Column(PickleType, nullable=False)
+
+    sweep_id = Column(GUID(), ForeignKey("sweeps.id", ondelete="cascade"), nullable=False)
+    sweep = relationship("Sweep", back_populates="variants")
+
+    # Задача варианта: томография и результат варианта хранятся как у обычной задачи
+    task_id = Column(GUID(), ForeignKey("tasks.id", ondelete="cascade"), nullable=False)
+    task = relationship("Task")
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.id}>'
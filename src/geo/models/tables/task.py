@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, Enum, DateTime, func
+from sqlalchemy import Column, Enum, DateTime, DOUBLE, func
 from sqlalchemy.orm import relationship
 
 from geo.db import Base
@@ -14,6 +14,7 @@ class Task(Base):
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     state = Column(Enum(TaskState), default=TaskState.PLAIN, nullable=False)
     step = Column(Enum(TaskStep), nullable=True)
+    progress = Column(DOUBLE(), nullable=True)
 
     stations = relationship("Station", back_populates="task")
     events = relationship("Event", back_populates="task")
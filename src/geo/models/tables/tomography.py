@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, DOUBLE, ForeignKey, Integer, ARRAY, PickleType
+from sqlalchemy import Column, DOUBLE, ForeignKey, Integer, ARRAY, PickleType, VARCHAR
 from sqlalchemy.orm import relationship
 
 from geo.db import Base
@@ -42,6 +42,8 @@ class Tomography(Base):
     grid_size = Column(PickleType, nullable=False)
     grid_step = Column(PickleType, nullable=False)
     base_model = Column(PickleType, nullable=False)
+    input_hash = Column(VARCHAR(64), nullable=True, index=True)
+    cached_from = Column(GUID(), nullable=True)
 
     task_id = Column(GUID(), ForeignKey("tasks.id", ondelete="cascade"), nullable=False)
     task = relationship("Task", back_populates="tomography")
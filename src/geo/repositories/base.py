@@ -1,12 +1,31 @@
 import uuid
-from typing import Generic, Type, TypeVar, Optional
+from typing import Generic, Type, TypeVar, Optional, Sequence
 
-from sqlalchemy import update, delete, func, select, text
+import numpy as np
+from sqlalchemy import update, delete, func, select, text, insert, Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 T = TypeVar('T')
 
 
+def to_arrays(names: Sequence[str], rows: Sequence[Row], dtypes: dict[str, np.dtype] = None) -> dict[str, np.ndarray]:
+    """
+    Переводит строки результата запроса в массивы по колонкам
+
+    :param names: имена колонок в порядке запроса
+    :param rows: строки результата
+    :param dtypes: типы массивов {колонка: тип}
+    :return: {колонка: массив}
+    """
+    dtypes = dtypes or {}
+    if not rows:
+        return {name: np.empty(0, dtype=dtypes.get(name)) for name in names}
+    return {
+        name: np.asarray(values, dtype=dtypes.get(name))
+        for name, values in zip(names, zip(*rows))
+    }
+
+
 class BaseRepository(Generic[T]):
     table: Type[T]
 
@@ -27,6 +46,44 @@ class BaseRepository(Generic[T]):
             await self._session.commit()
         return model
 
+    async def create_many(
+            self,
+            columns: dict[str, Sequence],
+            commit: bool = True,
+            batch_size: int = None,
+            **kwargs
+    ) -> list[uuid.UUID]:
+        """
+        Создает пачку записей в БД
+
+        Записи передаются по колонкам и вставляются одним INSERT на каждую
+        пачку. Первичные ключи генерируются на стороне клиента, поэтому
+        идентификаторы известны без flush.
+
+        :param columns: значения колонок {колонка: [значение, ...]}
+        :param commit: автоматический коммит
+        :param batch_size: размер пачки (по умолчанию все записи разом)
+        :param kwargs: значения, общие для всех записей
+        :return: идентификаторы созданных записей в порядке колонок
+        """
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Колонки разной длины: {sorted(lengths)}")
+        size = lengths.pop() if lengths else 0
+
+        ids = list(columns["id"]) if "id" in columns else [uuid.uuid4() for _ in range(size)]
+        rows = [{**kwargs, "id": id_} for id_ in ids]
+        for name, values in columns.items():
+            for row, value in zip(rows, values):
+                row[name] = value
+
+        batch_size = batch_size or max(len(rows), 1)
+        for offset in range(0, len(rows), batch_size):
+            await self._session.execute(insert(self.table), rows[offset:offset + batch_size])
+        if commit:
+            await self._session.commit()
+        return ids
+
     async def get(self, **kwargs) -> Optional[T]:
         """
         Получает запись
@@ -67,6 +124,27 @@ class BaseRepository(Generic[T]):
         result = await self._session.execute(stmt)
         return result.scalars().all()
 
+    async def get_columns(
+            self,
+            *names: str,
+            dtypes: dict[str, np.dtype] = None,
+            **kwargs
+    ) -> dict[str, np.ndarray]:
+        """
+        Получает значения колонок записей в виде массивов без создания объектов ORM
+
+        :param names: имена колонок
+        :param dtypes: типы массивов {колонка: тип}
+        :param kwargs: filter by
+        :return: {колонка: массив}
+        """
+        stmt = (
+            select(*(getattr(self.table, name) for name in names))
+            .filter_by(**kwargs)
+        )
+        rows = (await self._session.execute(stmt)).all()
+        return to_arrays(names, rows, dtypes)
+
     async def update(self, id: uuid.UUID, commit: bool = True, **kwargs) -> None:
         """
         Обновляет запись
@@ -93,6 +171,18 @@ class BaseRepository(Generic[T]):
         if commit:
             await self._session.commit()
 
+    async def delete_all(self, commit: bool = True, **kwargs) -> None:
+        """
+        Удаляет все записи, подходящие под фильтр
+
+        :param commit: автоматический коммит
+        :param kwargs: filter by
+        :return:
+        """
+        await self._session.execute(delete(self.table).filter_by(**kwargs))
+        if commit:
+            await self._session.commit()
+
     async def count(self, **kwargs) -> int:
         """
         Возвращает количество записей
@@ -1,10 +1,13 @@
 from uuid import UUID
 
-from sqlalchemy import text, select
+import numpy as np
+from sqlalchemy import text, select, delete, func
 from sqlalchemy.orm import subqueryload
 
 from geo.models import tables
-from geo.repositories.base import BaseRepository
+from geo.repositories.base import BaseRepository, to_arrays
+from geo.repositories.event import EventRepo
+from geo.repositories.station import StationRepo
 
 
 class DetectionRepo(BaseRepository[tables.Detection]):
@@ -45,3 +48,60 @@ class DetectionRepo(BaseRepository[tables.Detection]):
 
         result = await self._session.execute(stmt)
         return result.scalars().all()
+
+    async def delete_by_task(self, task_id: UUID, commit: bool = True) -> None:
+        """
+        Удаляет вступления всех событий задачи
+
+        :param task_id: идентификатор задачи
+        :param commit: автоматический коммит
+        """
+        await self._session.execute(
+            delete(self.table)
+            .where(self.table.event_id.in_(select(tables.Event.id).where(tables.Event.task_id == task_id)))
+        )
+        if commit:
+            await self._session.commit()
+
+    async def get_columns_by_task(self, task_id: UUID) -> dict[str, np.ndarray]:
+        """
+        Получает вступления задачи одним запросом в виде массивов
+
+        Номера событий и станций - их позиции в порядке EventRepo.order и
+        StationRepo.order, в котором записываются координаты входного файла
+        HPS_ST3D. События нумеруются с 0, станции с 1, как в исходном формате,
+        где номерами служили номер события и числовой код станции.
+
+        :param task_id: идентификатор задачи
+        :return: {"phase": номер фазы, "time": время, "event": номер события, "station": номер станции}
+        """
+        events = (
+            select(tables.Event.id, (func.row_number().over(order_by=EventRepo.order) - 1).label("position"))
+            .where(tables.Event.task_id == task_id)
+            .subquery()
+        )
+        stations = (
+            select(tables.Station.id, func.row_number().over(order_by=StationRepo.order).label("position"))
+            .where(tables.Station.task_id == task_id)
+            .subquery()
+        )
+        stmt = (
+            select(
+                self.table.phase,
+                self.table.time,
+                events.c.position,
+                stations.c.position,
+            )
+            .join(events, self.table.event_id == events.c.id)
+            .join(stations, self.table.station_id == stations.c.id)
+            # Порядок строк не должен зависеть от плана соединения: от него зависит хэш входного файла
+            .order_by(events.c.position, stations.c.position, self.table.phase, self.table.id)
+        )
+        rows = (await self._session.execute(stmt)).all()
+        columns = to_arrays(
+            ("phase", "time", "event", "station"),
+            rows,
+            {"time": np.float64, "event": np.int64, "station": np.int64}
+        )
+        columns["phase"] = np.fromiter((phase.value for phase in columns["phase"]), dtype=np.int8, count=len(rows))
+        return columns
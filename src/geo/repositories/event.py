@@ -1,6 +1,44 @@
+import datetime
+import uuid
+
+import numpy as np
+from sqlalchemy import select, func, cast, Integer
+
 from geo.models import tables
-from geo.repositories.base import BaseRepository
+from geo.repositories.base import BaseRepository, to_arrays
 
 
 class EventRepo(BaseRepository[tables.Event]):
     table = tables.Event
+
+    # Порядок событий задачи во входном файле HPS_ST3D: по номеру события
+    order = (cast(table.event, Integer), table.id)
+
+    async def latest(self, task_id: uuid.UUID) -> tuple[datetime.datetime | None, int | None]:
+        """
+        Возвращает время последнего события задачи и наибольший номер события
+
+        :param task_id: идентификатор задачи
+        :return: (время, номер) или (None, None), если событий нет
+        """
+        stmt = (
+            select(func.max(self.table.time), func.max(cast(self.table.event, Integer)))
+            .where(self.table.task_id == task_id)
+        )
+        time, event = (await self._session.execute(stmt)).one()
+        return time, event
+
+    async def get_coords_by_task(self, task_id: uuid.UUID) -> dict[str, np.ndarray]:
+        """
+        Получает координаты событий задачи в порядке order
+
+        :param task_id: идентификатор задачи
+        :return: {"x": долгота, "y": широта, "z": глубина}
+        """
+        stmt = (
+            select(self.table.x, self.table.y, self.table.z)
+            .where(self.table.task_id == task_id)
+            .order_by(*self.order)
+        )
+        rows = (await self._session.execute(stmt)).all()
+        return to_arrays(("x", "y", "z"), rows, dict.fromkeys(("x", "y", "z"), np.float64))
@@ -1,6 +1,36 @@
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select, case, cast, Integer
+
 from geo.models import tables
-from geo.repositories.base import BaseRepository
+from geo.repositories.base import BaseRepository, to_arrays
 
 
 class StationRepo(BaseRepository[tables.Station]):
     table = tables.Station
+
+    # Порядок станций задачи во входном файле HPS_ST3D: сначала числовые коды
+    # по значению, затем остальные (как station_sort_key), станции разных сетей
+    # с одинаковым кодом различаются
+    order = (
+        case((table.station.op("GLOB")("*[^0-9]*"), 1), (table.station == "", 1), else_=0),
+        cast(table.station, Integer),
+        table.station,
+        table.network,
+    )
+
+    async def get_coords_by_task(self, task_id: UUID) -> dict[str, np.ndarray]:
+        """
+        Получает координаты станций задачи в порядке order
+
+        :param task_id: идентификатор задачи
+        :return: {"x": долгота, "y": широта, "z": высота}
+        """
+        stmt = (
+            select(self.table.x, self.table.y, self.table.z)
+            .where(self.table.task_id == task_id)
+            .order_by(*self.order)
+        )
+        rows = (await self._session.execute(stmt)).all()
+        return to_arrays(("x", "y", "z"), rows, dict.fromkeys(("x", "y", "z"), np.float64))
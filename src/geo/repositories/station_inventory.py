@@ -0,0 +1,47 @@
+import datetime
+from typing import Sequence
+
+from sqlalchemy import update, delete
+
+from geo.models import tables
+from geo.repositories.base import BaseRepository
+
+
+class StationInventoryRepo(BaseRepository[tables.StationInventory]):
+    table = tables.StationInventory
+
+    async def replace(
+            self,
+            network: str,
+            columns: dict[str, Sequence],
+            fetched_at: datetime.datetime,
+            commit: bool = True
+    ) -> None:
+        """
+        Заменяет станции сети в инвентаре и обновляет время получения всей сети
+
+        :param network: код сети
+        :param columns: значения колонок станций {колонка: [значение, ...]}
+        :param fetched_at: время получения инвентаря
+        :param commit: автоматический коммит
+        """
+        await self._session.execute(
+            delete(self.table)
+            .where(self.table.network == network, self.table.station.in_(list(columns["station"])))
+        )
+        await self.create_many(columns, commit=False, network=network, fetched_at=fetched_at)
+        await self.touch(network, fetched_at, commit=commit)
+
+    async def touch(self, network: str, fetched_at: datetime.datetime, commit: bool = True) -> None:
+        """
+        Обновляет время получения станций сети
+
+        :param network: код сети
+        :param fetched_at: время получения инвентаря
+        :param commit: автоматический коммит
+        """
+        await self._session.execute(
+            update(self.table).where(self.table.network == network).values(fetched_at=fetched_at)
+        )
+        if commit:
+            await self._session.commit()
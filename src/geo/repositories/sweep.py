@@ -0,0 +1,29 @@
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from geo.models import tables
+from geo.repositories.base import BaseRepository
+
+
+class SweepRepo(BaseRepository[tables.Sweep]):
+    table = tables.Sweep
+
+
+class SweepVariantRepo(BaseRepository[tables.SweepVariant]):
+    table = tables.SweepVariant
+
+    async def get_all_by_sweep(self, sweep_id: UUID) -> list[tables.SweepVariant]:
+        """
+        Получает варианты перебора вместе с их задачами
+
+        :param sweep_id: идентификатор перебора
+        :return: варианты
+        """
+        stmt = (
+            select(self.table)
+            .options(selectinload(self.table.task).selectinload(tables.Task.tomography))
+            .where(self.table.sweep_id == sweep_id)
+        )
+        return (await self._session.execute(stmt)).scalars().all()
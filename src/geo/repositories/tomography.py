@@ -1,6 +1,29 @@
+from uuid import UUID
+
+from sqlalchemy import select
+
 from geo.models import tables
+from geo.models.schemas import TaskState
 from geo.repositories.base import BaseRepository
 
 
 class TomographyRepo(BaseRepository[tables.Tomography]):
     table = tables.Tomography
+
+    async def get_all_done_by_hash(self, input_hash: str, exclude: UUID = None) -> list[tables.Tomography]:
+        """
+        Получает томографии завершенных задач с тем же входным файлом
+
+        :param input_hash: хэш входного файла
+        :param exclude: идентификатор задачи, которую нужно исключить
+        :return: томографии, начиная с последней завершенной
+        """
+        stmt = (
+            select(self.table)
+            .join(tables.Task, self.table.task_id == tables.Task.id)
+            .where(self.table.input_hash == input_hash, tables.Task.state == TaskState.DONE)
+            .order_by(tables.Task.completed_in.desc())
+        )
+        if exclude:
+            stmt = stmt.where(self.table.task_id != exclude)
+        return (await self._session.execute(stmt)).scalars().all()
@@ -1,10 +1,14 @@
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
 from geo.config import Config
+from geo.services.cache import FDSNCache, StartModelCache
 from geo.services.geo import GeoApplicationService
 from geo.services.stats import StatsApplicationService
 from geo.services.storage import FileStorage
 from geo.services.task import TaskApplicationService
+from geo.services.tomography_proc.solver import SolverManager
+from geo.utils.http import HttpProcessor
+from geo.utils.pipeline import PipelineStats
 from geo.utils.queue import Queue
 
 
@@ -15,13 +19,25 @@ class ServiceFactory:
             lazy_session: async_sessionmaker[AsyncSession],
             data_queue: Queue,
             tomography_queue: Queue,
-            storage: FileStorage
+            sweep_queue: Queue,
+            storage: FileStorage,
+            fdsn_cache: FDSNCache,
+            start_model_cache: StartModelCache,
+            http_client: HttpProcessor,
+            solver: SolverManager,
+            pipeline_stats: PipelineStats
     ):
         self._lazy_session = lazy_session
         self._data_queue = data_queue
         self._tomography_queue = tomography_queue
+        self._sweep_queue = sweep_queue
         self._config = config
         self._storage = storage
+        self._fdsn_cache = fdsn_cache
+        self._start_model_cache = start_model_cache
+        self._http_client = http_client
+        self._solver = solver
+        self._pipeline_stats = pipeline_stats
 
     @property
     def task(self) -> TaskApplicationService:
@@ -34,10 +50,20 @@ class ServiceFactory:
         return GeoApplicationService(
             data_queue=self._data_queue,
             tomography_queue=self._tomography_queue,
+            sweep_queue=self._sweep_queue,
             lazy_session=self._lazy_session,
-            storage=self._storage
+            storage=self._storage,
+            solver=self._solver,
+            config=self._config
         )
 
     @property
     def stats(self) -> StatsApplicationService:
-        return StatsApplicationService(config=self._config)
+        return StatsApplicationService(
+            config=self._config,
+            fdsn_cache=self._fdsn_cache,
+            start_model_cache=self._start_model_cache,
+            http_client=self._http_client,
+            solver=self._solver,
+            pipeline_stats=self._pipeline_stats
+        )
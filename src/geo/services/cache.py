@@ -0,0 +1,269 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlencode
+
+import numpy as np
+
+from geo.services.storage import FileStorage
+
+
+@dataclass
+class CacheEntry:
+    size: int
+    created_at: float
+
+
+class FileCache:
+
+    def __init__(self, storage: FileStorage, directory: str, max_size: int):
+        """
+        Кэш файлов в FileStorage с вытеснением по LRU
+
+        Файлы хранятся под именами ключей, поэтому кэш переживает перезапуск:
+        при создании содержимое директории читается в порядке последнего доступа.
+
+        :param storage: файловое хранилище
+        :param directory: директория кэша внутри хранилища
+        :param max_size: максимальный суммарный размер файлов в байтах
+        """
+        self._storage = storage
+        self._directory = directory
+        self._max_size = max_size
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self._storage.abs_path(self._directory), exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        files = []
+        with os.scandir(self._storage.abs_path(self._directory)) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    files.append((stat.st_atime, entry.name, CacheEntry(stat.st_size, stat.st_mtime)))
+
+        for _, key, entry in sorted(files):
+            self._entries[key] = entry
+
+    def path(self, key: str) -> str:
+        return self._storage.abs_path(os.path.join(self._directory, key))
+
+    @property
+    def size(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    async def get(self, key: str, ttl: float = None, destination: str = None) -> str | None:
+        """
+        Возвращает путь к файлу в кэше
+
+        Файл в кэше может быть удален вытеснением или истечением времени жизни
+        по запросу другой задачи. Если его читают не сразу, следует передать
+        destination: файл будет закреплен ссылкой по этому пути.
+
+        :param key: ключ
+        :param ttl: время жизни записи в секундах (без ограничения, если не задано)
+        :param destination: путь, по которому создается ссылка на файл
+        :return: абсолютный путь (destination, если задан) или None при промахе
+        """
+        entry = self._entries.get(key)
+        if entry and ttl is not None and time.time() - entry.created_at > ttl:
+            await self._evict(key)
+            entry = None
+
+        if not entry:
+            self.misses += 1
+            return None
+
+        path = self.path(key)
+        try:
+            os.utime(path, (time.time(), entry.created_at))
+            if destination:
+                path = await self._storage.link(path, destination)
+        except FileNotFoundError:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return path
+
+    async def put(self, key: str, source: str | bytes) -> str:
+        """
+        Копирует файл в кэш
+
+        :param key: ключ
+        :param source: путь к исходному файлу или содержимое
+        :return: абсолютный путь к файлу в кэше
+        """
+        path = self.path(key)
+        # Уникальное временное имя: одновременные put одного ключа не пишут в один файл
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            if isinstance(source, bytes):
+                await self._storage.save(os.path.join(self._directory, os.path.basename(tmp_path)), source, "wb")
+            else:
+                await self._storage.link(source, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        now = time.time()
+        os.utime(path, (now, now))
+        self._entries[key] = CacheEntry(os.path.getsize(path), now)
+        self._entries.move_to_end(key)
+
+        while self.size > self._max_size and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == key:
+                break
+            await self._evict(oldest)
+        return path
+
+    async def _evict(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self.evictions += 1
+        try:
+            await self._storage.delete(os.path.join(self._directory, key))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_size": self._max_size,
+        }
+
+
+class FDSNCache(FileCache):
+
+    def __init__(self, storage: FileStorage, ttl: dict[str, int], max_size: int, directory: str = "fdsn_cache"):
+        """
+        Кэш ответов FDSN веб-сервисов
+
+        :param storage: файловое хранилище
+        :param ttl: время жизни ответов в секундах по сервисам {"event": ..., "station": ...},
+            ответы сервисов без TTL или с нулевым TTL не кэшируются
+        :param max_size: максимальный суммарный размер ответов в байтах
+        :param directory: директория кэша внутри хранилища
+        """
+        super().__init__(storage, directory, max_size)
+        self._ttl = ttl
+
+    @staticmethod
+    def service(url: str) -> str:
+        """
+        Имя FDSN сервиса по URL вида /fdsnws/<service>/1/query
+        """
+        parts = [part for part in urlsplit(url).path.split("/") if part]
+        return parts[1] if len(parts) > 1 and parts[0] == "fdsnws" else ""
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        parts = urlsplit(url)
+        query = urlencode(sorted((str(name), str(value)) for name, value in (params or {}).items()))
+        normalized = f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path.rstrip('/')}?{query}"
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def enabled(self, url: str) -> bool:
+        return bool(self._ttl.get(self.service(url)))
+
+    async def get_response(self, url: str, params: dict, filepath: str) -> str | None:
+        """
+        Возвращает ответ из кэша, закрепленный ссылкой в filepath
+
+        :param url:
+        :param params: query параметры
+        :param filepath: путь к файлу ответа задачи
+        :return: filepath или None при промахе
+        """
+        if not self.enabled(url):
+            return None
+        path = await self.get(self.key(url, params), ttl=self._ttl[self.service(url)], destination=filepath)
+        if path:
+            logging.debug(f"[FDSNCache] Ответ {url!r} получен из кэша")
+        return path
+
+    async def put_response(self, url: str, params: dict, source: str | bytes) -> str | bytes:
+        """
+        Сохраняет ответ в кэш
+
+        :return: source - файл задачи, а не файл кэша, который может быть вытеснен
+        """
+        if self.enabled(url):
+            await self.put(self.key(url, params), source)
+        return source
+
+
+class StartModelCache(FileCache):
+    # Меняется при изменении алгоритма построения стартовой модели
+    version = 1
+
+    def __init__(self, storage: FileStorage, max_size: int, directory: str = "start_model_cache"):
+        """
+        Кэш стартовых скоростных моделей по содержимому
+
+        Модель хранится одним .npy файлом [Vp, Vs] и читается через mmap.
+
+        :param storage: файловое хранилище
+        :param max_size: максимальный суммарный размер моделей в байтах
+        :param directory: директория кэша внутри хранилища
+        """
+        super().__init__(storage, directory, max_size)
+
+    @classmethod
+    def key(cls, base_model: list[list[float]], grid_size: list[int]) -> str:
+        content = json.dumps([cls.version, base_model, list(grid_size)], separators=(",", ":"))
+        return f"{hashlib.sha256(content.encode()).hexdigest()}.npy"
+
+    async def get_model(
+            self,
+            base_model: list[list[float]],
+            grid_size: list[int]
+    ) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        Возвращает модели Vp и Vs из кэша
+
+        :param base_model: одномерная модель
+        :param grid_size: размер сетки
+        :return: (Vp, Vs) или None при промахе
+        """
+        path = await self.get(self.key(base_model, grid_size))
+        if not path:
+            return None
+        models = np.load(path, mmap_mode="r")
+        return models[0], models[1]
+
+    async def put_model(
+            self,
+            base_model: list[list[float]],
+            grid_size: list[int],
+            source: str
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Добавляет в кэш файл моделей, построенный save_start_model
+
+        :param base_model: одномерная модель
+        :param grid_size: размер сетки
+        :param source: путь к .npy файлу [Vp, Vs]
+        :return: (Vp, Vs)
+        """
+        path = await self.put(self.key(base_model, grid_size), source)
+        models = np.load(path, mmap_mode="r")
+        return models[0], models[1]
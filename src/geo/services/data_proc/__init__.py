@@ -1,57 +1,636 @@
 import asyncio
+import datetime
 import logging
 import os
-from tempfile import NamedTemporaryFile
-from urllib.parse import urljoin
+from collections import deque
+from typing import Awaitable, Callable
+from tempfile import TemporaryDirectory
+from urllib.parse import urljoin, urlsplit
 
-import aiofiles
-from aiomultiprocess import Worker
-from httpx import HTTPError
+import numpy as np
+from aiomultiprocess import Pool
+from httpx import HTTPError, TimeoutException
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from geo.models.schemas import TaskState, TaskStep
+from geo.config import Config
+from geo.models.schemas import TaskID, TaskState, TaskStep, Phase
 from geo.repositories import TaskRepo
 from geo.repositories.detection import DetectionRepo
 from geo.repositories.event import EventRepo
 from geo.repositories.seisdata import SeisDataRepo
 from geo.repositories.station import StationRepo
+from geo.repositories.station_inventory import StationInventoryRepo
+from geo.services.cache import FDSNCache
 from geo.services.data_proc.utils import (
     quake,
-    stations
+    stations,
+    Payload,
+    station_sort_key,
+    to_records,
+    save_records,
+    load_records,
+    STATION_DTYPE
 )
 from geo.utils.http import HttpProcessor
+from geo.utils.pipeline import PipelineStats, StageStats
 from geo.utils.queue import Queue
 
 
-async def fetch_from_base(http_client: HttpProcessor, url: str, params: dict = None):
-    retry = 3
-    for index in range(retry):
-        try:
-            async with http_client as client:
-                return await client.get(url=url, params=params)
-        except HTTPError as error:
-            logging.error(f"[SeisDataProc] Ошибка при получении данных {error!r}, попытка {index + 1}/{retry}")
-            continue
+class FetchLimitExceeded(Exception):
+    """
+    Запрос превысил ограничение сервера по объему данных или времени
+    """
+
+
+class FetchFailed(Exception):
+    """
+    Не удалось получить данные задачи
+    """
+
+
+class NoDataAvailable(Exception):
+    """
+    Сервер ответил, что данных по запросу нет
+    """
+
+
+async def fetch_from_base(
+        http_client: HttpProcessor,
+        url: str,
+        filepath: str,
+        params: dict = None,
+        cache: FDSNCache = None,
+        split_on_limit: bool = False,
+        raise_on_nodata: bool = False,
+        spill_size: int = None
+) -> Payload | None:
+    """
+    Получает ответ FDSN сервиса
+
+    При попадании в кэш запрос не выполняется. Повторы, задержки между ними,
+    общее ограничение времени и дублирующие запросы задаются политикой
+    http_client.retry_policy, попытки и время ответа пишутся в http_client.stats.
+
+    :param http_client:
+    :param url:
+    :param filepath: путь к файлу для сохранения ответа
+    :param params: query параметры
+    :param cache: кэш ответов
+    :param split_on_limit: выбросить FetchLimitExceeded вместо повторов
+        при таймауте или ответе 413
+    :param raise_on_nodata: выбросить NoDataAvailable при ответе 204 или 404
+    :param spill_size: максимальный размер ответа в памяти в байтах, ответы
+        больше записываются в filepath (по умолчанию всегда в файл)
+    :return: содержимое ответа, путь к файлу с ответом или None при ошибке
+    """
+    if cache and (cached := await cache.get_response(url, params, filepath)):
+        return cached
+
+    policy = http_client.retry_policy
+    stats = http_client.stats.endpoint(urlsplit(url).path)
+    try:
+        async with asyncio.timeout(policy.deadline):
+            for attempt in range(policy.attempts):
+                if attempt:
+                    stats.retries += 1
+                    await asyncio.sleep(policy.backoff(attempt - 1))
+                stats.attempts += 1
+
+                hedge_after = None
+                if policy.hedge:
+                    hedge_after = stats.quantile(policy.hedge_quantile, policy.hedge_min_samples)
+                try:
+                    result = await http_client.download_hedged(
+                        url=url,
+                        filepath=filepath,
+                        params=params,
+                        hedge_after=hedge_after,
+                        spill_size=spill_size
+                    )
+                except TimeoutException as error:
+                    if split_on_limit:
+                        raise FetchLimitExceeded(url) from error
+                    logging.error(
+                        f"[SeisDataProc] Ошибка при получении данных {error!r}, "
+                        f"попытка {attempt + 1}/{policy.attempts}"
+                    )
+                    continue
+                except HTTPError as error:
+                    logging.error(
+                        f"[SeisDataProc] Ошибка при получении данных {error!r}, "
+                        f"попытка {attempt + 1}/{policy.attempts}"
+                    )
+                    continue
+
+                stats.latency.append(result.headers_elapsed)
+                stats.hedges += result.hedged
+                stats.hedge_wins += result.hedge_won
+                logging.debug(
+                    f"[SeisDataProc] {url!r}: статус {result.status_code}, "
+                    f"{result.size} байт за {result.elapsed:.2f} с"
+                )
+                if result.status_code == 413 and split_on_limit:
+                    raise FetchLimitExceeded(url)
+                if result.status_code in (204, 404) and raise_on_nodata:
+                    raise NoDataAvailable(url)
+                if result.status_code in policy.retry_statuses:
+                    logging.error(
+                        f"[SeisDataProc] Ошибка при получении данных {url!r}: статус {result.status_code}, "
+                        f"попытка {attempt + 1}/{policy.attempts}"
+                    )
+                    continue
+                if not result.is_success:
+                    logging.error(f"[SeisDataProc] Ошибка при получении данных {url!r}: статус {result.status_code}")
+                    break
+                payload = result.content if result.content is not None else filepath
+                if cache:
+                    return await cache.put_response(url, params, payload)
+                return payload
+    except TimeoutError as error:
+        if split_on_limit:
+            raise FetchLimitExceeded(url) from error
+        logging.error(f"[SeisDataProc] Превышено время получения данных {url!r}: {policy.deadline} с")
+
+    stats.failures += 1
     return None
 
 
-async def cpu_worker(quake_file: str, station_file: str):
-    events, detections = quake(quake_file)
-    station_table = stations(station_file)
+def split_time_range(
+        start: datetime.datetime,
+        end: datetime.datetime,
+        window: datetime.timedelta
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Разбивает интервал времени на последовательные окна
+
+    :param start: начало интервала
+    :param end: конец интервала
+    :param window: длина окна
+    :return: список окон (начало, конец)
+    """
+    windows = []
+    while start < end:
+        windows.append((start, min(start + window, end)))
+        start += window
+    return windows
+
+
+async def fetch_events(
+        http_client: HttpProcessor,
+        url: str,
+        params: dict,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        directory: str,
+        semaphore: asyncio.Semaphore,
+        min_window: datetime.timedelta,
+        cache: FDSNCache = None,
+        spill_size: int = None
+) -> list[Payload] | None:
+    """
+    Получает каталог событий за окно времени
+
+    Если сервер не успевает ответить или отказывает из-за объема данных,
+    окно делится пополам, пока не станет короче min_window.
+
+    :param http_client:
+    :param url:
+    :param params: query параметры без starttime и endtime
+    :param start: начало окна
+    :param end: конец окна
+    :param directory: директория для сохранения ответов
+    :param semaphore: ограничение количества одновременных запросов
+    :param min_window: минимальная длина окна
+    :param cache: кэш ответов
+    :param spill_size: максимальный размер части каталога в памяти в байтах
+    :return: части каталога (содержимое или пути к файлам) или None при ошибке
+    """
+    window_params = {**params, "starttime": start.isoformat(), "endtime": end.isoformat()}
+    filepath = os.path.join(directory, f"quake_{start:%Y%m%dT%H%M%S%f}_{end:%Y%m%dT%H%M%S%f}.xml")
+    try:
+        async with semaphore:
+            path = await fetch_from_base(
+                http_client,
+                url=url,
+                filepath=filepath,
+                params=window_params,
+                cache=cache,
+                split_on_limit=end - start > min_window,
+                spill_size=spill_size
+            )
+    except FetchLimitExceeded:
+        middle = start + (end - start) / 2
+        logging.info(f"[SeisDataProc] Окно {start.isoformat()} - {end.isoformat()} разбито на два")
+        parts = await asyncio.gather(
+            fetch_events(http_client, url, params, start, middle, directory, semaphore, min_window, cache, spill_size),
+            fetch_events(http_client, url, params, middle, end, directory, semaphore, min_window, cache, spill_size)
+        )
+        if None in parts:
+            return None
+        return parts[0] + parts[1]
+    return [path] if path is not None else None
+
+
+async def station_inventory(
+        lazy_session: async_sessionmaker[AsyncSession],
+        http_client: HttpProcessor,
+        process_pool: Pool,
+        url: str,
+        network: str,
+        directory: str,
+        ttl: datetime.timedelta,
+        cache: FDSNCache = None,
+        spill_size: int = None
+) -> np.ndarray | None:
+    """
+    Получает станции сети из общего инвентаря
+
+    Инвентарь сети загружается с сервера один раз и хранится в БД. По истечении
+    ttl он перепроверяется запросом с updatedafter: сервер возвращает только
+    измененные станции, а при отсутствии изменений обновляется лишь время получения.
+
+    :param lazy_session:
+    :param http_client:
+    :param process_pool: пул процессов для разбора ответа
+    :param url: URL FDSN station сервиса
+    :param network: код сети
+    :param directory: директория для сохранения ответа
+    :param ttl: время, в течение которого инвентарь не перепроверяется
+    :param cache: кэш ответов
+    :param spill_size: максимальный размер ответа в памяти в байтах
+    :return: станции STATION_DTYPE или None при ошибке
+    """
+    async with lazy_session() as session:
+        rows = await StationInventoryRepo(session).get_all(network=network)
+
+    now = datetime.datetime.now(datetime.UTC)
+    fetched_at = min((row.fetched_at for row in rows), default=None)
+    if fetched_at and not fetched_at.tzinfo:
+        fetched_at = fetched_at.replace(tzinfo=datetime.UTC)
+
+    if fetched_at is None or now - fetched_at >= ttl:
+        params = {"network": network, "level": "station", "format": "text", "nodata": 404}
+        if fetched_at is not None:
+            params["updatedafter"] = fetched_at.replace(tzinfo=None).isoformat()
+        try:
+            payload = await fetch_from_base(
+                http_client,
+                url=url,
+                filepath=os.path.join(directory, f"station_{network}.txt"),
+                params=params,
+                cache=None if fetched_at else cache,
+                raise_on_nodata=fetched_at is not None,
+                spill_size=spill_size
+            )
+        except NoDataAvailable:
+            logging.debug(f"[SeisDataProc] Инвентарь сети {network!r} не изменился с {fetched_at}")
+            async with lazy_session() as session:
+                await StationInventoryRepo(session).touch(network, now)
+        else:
+            if payload is None:
+                if not rows:
+                    return None
+                logging.warning(f"[SeisDataProc] Инвентарь сети {network!r} не обновлен, используется от {fetched_at}")
+            else:
+                table = await process_pool.apply(station_worker, args=(payload,))
+                logging.info(f"[SeisDataProc] Инвентарь сети {network!r}: получено {len(table)} станций")
+                async with lazy_session() as session:
+                    inventory_repo = StationInventoryRepo(session)
+                    await inventory_repo.replace(
+                        network,
+                        columns={
+                            "station": table["station"].tolist(),
+                            "x": table["x"].tolist(),
+                            "y": table["y"].tolist(),
+                            "z": table["z"].tolist(),
+                        },
+                        fetched_at=now
+                    )
+                    rows = await inventory_repo.get_all(network=network)
+
+    rows = sorted(rows, key=lambda row: station_sort_key(row.station))
+    return to_records(STATION_DTYPE, {
+        "station": [row.station for row in rows],
+        "network": [row.network for row in rows],
+        "x": [row.x for row in rows],
+        "y": [row.y for row in rows],
+        "z": [row.z for row in rows],
+    })
+
+
+async def station_inventories(
+        lazy_session: async_sessionmaker[AsyncSession],
+        http_client: HttpProcessor,
+        process_pool: Pool,
+        url: str,
+        networks: list[str],
+        directory: str,
+        ttl: datetime.timedelta,
+        cache: FDSNCache = None,
+        spill_size: int = None
+) -> np.ndarray | None:
+    """
+    Получает станции нескольких сетей, инвентари сетей запрашиваются одновременно
+
+    :param lazy_session:
+    :param http_client:
+    :param process_pool: пул процессов для разбора ответов
+    :param url: URL FDSN station сервиса
+    :param networks: коды сетей
+    :param directory: директория для сохранения ответов
+    :param ttl: время, в течение которого инвентарь не перепроверяется
+    :param cache: кэш ответов
+    :param spill_size: максимальный размер ответа в памяти в байтах
+    :return: станции STATION_DTYPE всех сетей или None при ошибке
+    """
+    tables = await asyncio.gather(*[
+        station_inventory(lazy_session, http_client, process_pool, url, network, directory, ttl, cache, spill_size)
+        for network in networks
+    ])
+    if any(table is None for table in tables):
+        return None
+
+    station_table = np.concatenate(tables)
+    order = sorted(
+        range(len(station_table)),
+        key=lambda i: (station_sort_key(station_table["station"][i]), station_table["network"][i])
+    )
+    return station_table[order]
+
+
+async def station_worker(station_payload: Payload) -> np.ndarray:
+    return stations(station_payload)
+
+
+async def cpu_worker(quake_payloads: list[Payload], quakeml_parser: str, directory: str):
+    events, detections, pick_stations = quake(quake_payloads, quakeml_parser)
+    os.makedirs(directory, exist_ok=True)
+
+    return save_records(
+        directory,
+        events=events,
+        detections=detections,
+        pick_stations=pick_stations
+    )
+
+
+async def save_seisdata(
+        session: AsyncSession,
+        task_id: TaskID,
+        events: np.ndarray,
+        detections: np.ndarray,
+        pick_stations: np.ndarray,
+        station_table: np.ndarray,
+        batch_size: int,
+        event_offset: int = 0
+) -> None:
+    """
+    Записывает часть результата обработки задачи в БД одной транзакцией
+
+    Данные дописываются к уже сохраненным: станции, присутствующие в задаче,
+    повторно не создаются, а номера событий сдвигаются на event_offset.
+
+    :param session: сессия БД
+    :param task_id: идентификатор задачи
+    :param events: события EVENT_DTYPE
+    :param detections: детекции DETECTION_DTYPE
+    :param pick_stations: станции детекций PICK_STATION_DTYPE
+    :param station_table: станции STATION_DTYPE
+    :param batch_size: размер пачки INSERT
+    :param event_offset: номер первого нового события
+    """
+    station_repo = StationRepo(session)
+    event_repo = EventRepo(session)
+    detection_repo = DetectionRepo(session)
+
+    station_code_id = {
+        (station.network, station.station): station.id for station in await station_repo.get_all(task_id=task_id)
+    }
+    station_codes = list(zip(station_table["network"].tolist(), station_table["station"].tolist()))
+    new_stations = station_table[np.asarray([code not in station_code_id for code in station_codes], dtype=bool)]
+    station_ids = await station_repo.create_many(
+        columns={
+            "network": new_stations["network"].tolist(),
+            "station": new_stations["station"].tolist(),
+            "x": new_stations["x"].tolist(),
+            "y": new_stations["y"].tolist(),
+            "z": new_stations["z"].tolist(),
+        },
+        task_id=task_id,
+        batch_size=batch_size,
+        commit=False
+    )
+    station_code_id.update(zip(zip(new_stations["network"].tolist(), new_stations["station"].tolist()), station_ids))
+
+    event_ids = await event_repo.create_many(
+        columns={
+            "time": events["time"].tolist(),
+            "magnitude": events["magnitude"].tolist(),
+            "network": events["network"].tolist(),
+            "event": (events["event"] + event_offset).tolist(),
+            "public_id": events["public_id"].tolist(),
+            "x": events["x"].tolist(),
+            "y": events["y"].tolist(),
+            "z": events["z"].tolist(),
+        },
+        task_id=task_id,
+        batch_size=batch_size,
+        commit=False
+    )
+
+    pick_station_codes = list(zip(pick_stations["network"].tolist(), pick_stations["station"].tolist()))
+    pick_station_ids = np.asarray([station_code_id.get(code) for code in pick_station_codes], dtype=object)
+    unknown_stations = sorted(
+        f"{network}.{station}"
+        for (network, station), station_id in zip(pick_station_codes, pick_station_ids) if station_id is None
+    )
+    if unknown_stations:
+        logging.warning(
+            f"[SeisDataProc] Задача {task_id!r}: детекции станций {unknown_stations} "
+            f"пропущены, станции отсутствуют в инвентаре"
+        )
+
+    known_stations = np.asarray([station_id is not None for station_id in pick_station_ids], dtype=bool)
+    known = known_stations[detections["station"]]
+    phases = {phase.value: phase for phase in Phase}
+    await detection_repo.create_many(
+        columns={
+            "phase": [phases[code] for code in detections["phase"][known].tolist()],
+            "time": detections["time"][known].tolist(),
+            "station_id": pick_station_ids[detections["station"][known]].tolist(),
+            "event_id": np.asarray(event_ids, dtype=object)[detections["event"][known]].tolist(),
+        },
+        batch_size=batch_size,
+        commit=False
+    )
+    await session.commit()
+
+
+async def delete_seisdata(session: AsyncSession, task_id: TaskID, commit: bool = True) -> None:
+    """
+    Удаляет сохраненные события, вступления и станции задачи
+
+    :param session: сессия БД
+    :param task_id: идентификатор задачи
+    :param commit: автоматический коммит
+    """
+    await DetectionRepo(session).delete_by_task(task_id, commit=False)
+    await EventRepo(session).delete_all(task_id=task_id, commit=False)
+    await StationRepo(session).delete_all(task_id=task_id, commit=False)
+    if commit:
+        await session.commit()
 
-    return events, detections, station_table
+
+def drop_seen_events(
+        events: np.ndarray,
+        detections: np.ndarray,
+        seen: set[str]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Отбрасывает события, уже записанные из предыдущих частей каталога
+
+    Соседние окна времени могут вернуть одно событие на общей границе.
+    Оставшиеся события нумеруются подряд, ссылки детекций пересчитываются.
+
+    :param events: события EVENT_DTYPE
+    :param detections: детекции DETECTION_DTYPE
+    :param seen: идентификаторы записанных событий, дополняется новыми
+    :return: новые события и их детекции
+    """
+    public_ids = events["public_id"].tolist()
+    keep = np.asarray([public_id not in seen for public_id in public_ids], dtype=bool)
+    seen.update(public_ids)
+
+    rows = np.cumsum(keep) - 1
+    events = events[keep]
+    events["event"] = np.arange(len(events))
+    detections = detections[keep[detections["event"]]]
+    detections["event"] = rows[detections["event"]]
+    return events, detections
+
+
+async def fetch_stage(
+        windows: list[tuple[datetime.datetime, datetime.datetime]],
+        fetch: Callable[[datetime.datetime, datetime.datetime], Awaitable[list[Payload] | None]],
+        output: asyncio.Queue,
+        lookahead: int,
+        stats: StageStats
+) -> None:
+    """
+    Стадия получения: загружает окна каталога и передает их дальше по порядку
+
+    Одновременно загружается не больше lookahead окон. Когда очередь
+    заполнена, новые окна не запрашиваются, пока разбор не освободит место.
+
+    :param windows: окна времени
+    :param fetch: загрузка окна, возвращает части каталога или None при ошибке
+    :param output: очередь частей каталога, в конце передается None
+    :param lookahead: количество одновременно загружаемых окон
+    :param stats: статистика стадии
+    """
+    pending: deque[asyncio.Task] = deque()
+    try:
+        for index, (start, end) in enumerate(windows):
+            pending.append(asyncio.create_task(fetch(start, end)))
+            while pending and (len(pending) >= lookahead or index == len(windows) - 1):
+                with stats.measure():
+                    parts = await pending.popleft()
+                if parts is None:
+                    raise FetchFailed("Ошибка при получении каталога событий")
+                await output.put(parts)
+    finally:
+        for task in pending:
+            task.cancel()
+    await output.put(None)
+
+
+async def parse_stage(
+        process_pool: Pool,
+        input: asyncio.Queue,
+        output: asyncio.Queue,
+        quakeml_parser: str,
+        directory: str,
+        stats: StageStats
+) -> None:
+    """
+    Стадия разбора: сопоставляет пики каждого окна в пуле процессов
+
+    :param process_pool: пул процессов
+    :param input: очередь частей каталога
+    :param output: очередь результатов разбора, в конце передается None
+    :param quakeml_parser: способ разбора QuakeML
+    :param directory: директория для результатов разбора
+    :param stats: статистика стадии
+    """
+    index = 0
+    while (parts := await input.get()) is not None:
+        with stats.measure():
+            records = load_records(await process_pool.apply(
+                cpu_worker,
+                args=(parts, quakeml_parser, os.path.join(directory, f"part_{index}"))
+            ))
+        index += 1
+        await output.put(records)
+    await output.put(None)
+
+
+async def write_stage(
+        lazy_session: async_sessionmaker[AsyncSession],
+        task_id: TaskID,
+        input: asyncio.Queue,
+        station_table: Awaitable[np.ndarray | None],
+        event_offset: int,
+        batch_size: int,
+        stats: StageStats
+) -> int:
+    """
+    Стадия записи: сохраняет результаты разбора каждого окна отдельной транзакцией
+
+    :param lazy_session:
+    :param task_id: идентификатор задачи
+    :param input: очередь результатов разбора
+    :param station_table: получение станций STATION_DTYPE, None при ошибке
+    :param event_offset: номер первого нового события
+    :param batch_size: размер пачки INSERT
+    :param stats: статистика стадии
+    :return: количество записанных событий
+    """
+    station_table = await station_table
+    if station_table is None:
+        raise FetchFailed("Ошибка при получении данных станций")
+
+    seen = set()
+    written = 0
+    while (records := await input.get()) is not None:
+        events, detections = drop_seen_events(records["events"], records["detections"], seen)
+        if not len(events):
+            continue
+        with stats.measure(len(events)):
+            async with lazy_session() as session:
+                await save_seisdata(
+                    session, task_id, events, detections, records["pick_stations"], station_table, batch_size,
+                    event_offset=event_offset + written
+                )
+        written += len(events)
+        logging.debug(f"[SeisDataProc] Задача {task_id!r}: записано {written} событий")
+    return written
 
 
 async def worker(
         queue: Queue,
         lazy_session: async_sessionmaker[AsyncSession],
         http_client: HttpProcessor,
-        fdsn_base: str
-
+        fdsn_cache: FDSNCache,
+        process_pool: Pool,
+        pipeline_stats: PipelineStats,
+        config: Config
 ):
-    task_id = queue.dequeue()
-    if not task_id:
+    # Элемент очереди: (идентификатор задачи, запрошенное время окончания
+    # обновления или None при первой загрузке)
+    job = queue.dequeue()
+    if not job:
         return
+    task_id, requested_end_time = job
 
     logging.debug(f"[SeisDataProc] Получена задача с id {task_id!r}")
     async with lazy_session() as session:
@@ -68,13 +647,26 @@ async def worker(
             logging.error(f"[SeisDataProc] Данные задачи с task_id {task_id!r} не существуют")
             return
 
+        latest_time, latest_event = await EventRepo(session).latest(task_id=task_id)
+
+    # При обновлении задачи запрашиваются только события после последнего сохраненного,
+    # при ошибке задача возвращается в исходное состояние с уже загруженными данными.
+    # При первой загрузке окна записываются по мере получения, поэтому при ошибке
+    # записанные окна удаляются: задача получает либо все данные, либо никаких
+    refresh = latest_time is not None
+    start_time = latest_time + datetime.timedelta(microseconds=1) if refresh else data.start_time
+    event_offset = latest_event + 1 if refresh else 0
+    failed_state = TaskState.PENDING if refresh else TaskState.FAILED
+    # Время окончания данных задачи сдвигается только после успешной загрузки,
+    # иначе следующее обновление пропустило бы незагруженный промежуток
+    end_time = requested_end_time or data.end_time
+
     quake_params = {
         "includeallorigins": "true",
         "includearrivals": "true",
         "includeallmagnitudes": "true",
-        "starttime": data.start_time.isoformat(),
-        "endtime": data.end_time.isoformat(),
-        "nodata": 404,
+        "orderby": "time-asc",
+        "nodata": 204,
     }
     if data.min_latitude:
         quake_params["minlatitude"] = data.min_latitude
@@ -85,99 +677,84 @@ async def worker(
     if data.max_longitude:
         quake_params["maxlongitude"] = data.max_longitude
 
-    quake_resp, station_resp = await asyncio.gather(
-        fetch_from_base(
-            http_client,
-            url=urljoin(fdsn_base, "/fdsnws/event/1/query"),
-            params=quake_params
-        ),
-        fetch_from_base(
-            http_client,
-            url=urljoin(fdsn_base, "/fdsnws/station/1/query"),
-            params={
-                "network": data.network,
-                "nodata": 404,
-            }
-        )
+    semaphore = asyncio.Semaphore(config.FDSN_CONCURRENCY)
+    quake_url = urljoin(config.FDSN_BASE, "/fdsnws/event/1/query")
+    windows = split_time_range(
+        start_time,
+        end_time,
+        datetime.timedelta(seconds=config.FDSN_EVENT_WINDOW)
     )
-    if not quake_resp or not station_resp:
-        logging.error(f"[SeisDataProc] Ошибка при получении данных станций")
-        async with lazy_session() as session:
-            task_repo = TaskRepo(session)
-            await task_repo.update(id=task_id, state=TaskState.FAILED)
-        return
-
-    station_xml = station_resp.text
-    quake_xml = quake_resp.text
-
-    if not station_resp.is_success or not quake_resp.is_success:
-        logging.error(f"[SeisDataProc] Ошибка при получении данных станций {station_resp.status_code}")
-        async with lazy_session() as session:
-            task_repo = TaskRepo(session)
-            await task_repo.update(id=task_id, state=TaskState.FAILED)
-        return
 
-    quake_file = NamedTemporaryFile(delete_on_close=False)
-    station_file = NamedTemporaryFile(delete_on_close=False)
-
-    async with aiofiles.open(station_file.name, 'w') as file:
-        await file.write(station_xml)
-
-    async with aiofiles.open(quake_file.name, 'w') as file:
-        await file.write(quake_xml)
-
-    logging.debug(f"[SeisDataProc] Обработка данных")
+    # Ответы до FDSN_SPILL_SIZE байт разбираются из памяти, в директорию
+    # пишутся только большие ответы и результаты разбора
+    tmp_dir = TemporaryDirectory()
+    written = 0
+    try:
+        def fetch(start: datetime.datetime, end: datetime.datetime):
+            return fetch_events(
+                http_client,
+                url=quake_url,
+                params=quake_params,
+                start=start,
+                end=end,
+                directory=tmp_dir.name,
+                semaphore=semaphore,
+                min_window=datetime.timedelta(seconds=config.FDSN_EVENT_MIN_WINDOW),
+                cache=fdsn_cache,
+                spill_size=config.FDSN_SPILL_SIZE
+            )
 
-    events, detections, station_table = await Worker(
-        target=cpu_worker,
-        args=(quake_file.name, station_file.name)
-    )
+        # Окна загружаются, разбираются и записываются конвейером: события первых
+        # окон попадают в БД, пока следующие еще загружаются
+        parse_queue = pipeline_stats.queue("parse", config.FDSN_PIPELINE_DEPTH)
+        write_queue = pipeline_stats.queue("write", config.FDSN_PIPELINE_DEPTH)
+        logging.debug(f"[SeisDataProc] Обработка данных: {len(windows)} окон")
+        async with asyncio.TaskGroup() as group:
+            station_table = group.create_task(station_inventories(
+                lazy_session,
+                http_client,
+                process_pool,
+                url=urljoin(config.FDSN_BASE, "/fdsnws/station/1/query"),
+                networks=data.network.split(","),
+                directory=tmp_dir.name,
+                ttl=datetime.timedelta(seconds=config.STATION_INVENTORY_TTL),
+                cache=fdsn_cache,
+                spill_size=config.FDSN_SPILL_SIZE
+            ))
+            group.create_task(fetch_stage(
+                windows, fetch, parse_queue, config.FDSN_CONCURRENCY, pipeline_stats.stage("fetch")
+            ))
+            group.create_task(parse_stage(
+                process_pool, parse_queue, write_queue, config.QUAKEML_PARSER, tmp_dir.name,
+                pipeline_stats.stage("parse")
+            ))
+            writer = group.create_task(write_stage(
+                lazy_session, task_id, write_queue, station_table, event_offset, config.DB_BATCH_SIZE,
+                pipeline_stats.stage("write")
+            ))
+        written = writer.result()
+    except* FetchFailed as group:
+        for error in group.exceptions:
+            logging.error(f"[SeisDataProc] Задача {task_id!r}: {error}")
+    except* Exception as group:
+        for error in group.exceptions:
+            logging.error(f"[SeisDataProc] Ошибка при обработке задачи {task_id!r}: {error!r}", exc_info=error)
+    else:
+        if refresh and not written:
+            logging.info(f"[SeisDataProc] Задача {task_id!r}: новых событий после {latest_time} нет")
+        if written or refresh:
+            async with lazy_session() as session:
+                task_repo = TaskRepo(session)
+                seisdata_repo = SeisDataRepo(session)
+                await seisdata_repo.update(id=data.id, end_time=end_time, commit=False)
+                await task_repo.update(id=task_id, state=TaskState.PENDING, step=TaskStep.SEISDATA)
+            return
+        logging.error(f"[SeisDataProc] Задача {task_id!r}: события не найдены")
+    finally:
+        tmp_dir.cleanup()
 
-    # events, detections, station_table = await cpu_worker(quake_file.name, station_file.name)
     async with lazy_session() as session:
         task_repo = TaskRepo(session)
-        station_repo = StationRepo(session)
-        event_repo = EventRepo(session)
-        detection_repo = DetectionRepo(session)
-
-        for station_id, station in enumerate(station_table["station"]):
-            await station_repo.create(
-                network=station_table["network"][station_id],
-                station=station,
-                x=station_table["x"][station_id],
-                y=station_table["y"][station_id],
-                z=station_table["z"][station_id],
-                task_id=task_id,
-                commit=False
-            )
-        await session.commit()
-
-        event_name_id = {}
-        for event_name, payload in events.items():
-            event = await event_repo.create(
-                time=payload[0],
-                magnitude=payload[1],
-                network=payload[2],
-                event=event_name,
-                x=payload[3],
-                y=payload[4],
-                z=payload[5],
-                task_id=task_id,
-                commit=True
-            )
-            event_name_id[event_name] = event.id
-        for event_name, detection_list in detections.items():
-            for detection in detection_list:
-                station_id = (await station_repo.get(station=detection[2], task_id=task_id)).id
-                await detection_repo.create(
-                    phase=detection[0],
-                    time=detection[1],
-                    station_id=station_id,
-                    event_id=event_name_id[event_name],
-                    commit=False
-                )
-        await task_repo.update(id=task_id, state=TaskState.PENDING, step=TaskStep.SEISDATA, commit=False)
-        await session.commit()
-
-    os.remove(quake_file.name)
-    os.remove(station_file.name)
+        if not refresh:
+            await delete_seisdata(session, task_id, commit=False)
+        await task_repo.update(id=task_id, state=failed_state)
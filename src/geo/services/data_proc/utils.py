@@ -1,14 +1,102 @@
 import datetime
-from typing import Iterable
+import io
+import os
+from typing import IO, Iterable, Iterator, NamedTuple, Sequence
+from xml.etree import ElementTree
 
 import numpy as np
-import pandas as pd
-from obspy import read_inventory, read_events
+from obspy import read_events
 from obspy.core.event import Event
 
 from geo.models.schemas import Phase
 
 
+STATION_DTYPE = np.dtype([
+    ("station", "U32"),
+    ("network", "U32"),
+    ("x", "f8"),
+    ("y", "f8"),
+    ("z", "f8"),
+])
+EVENT_DTYPE = np.dtype([
+    ("event", "i8"),  # номер события в каталоге
+    ("public_id", "U255"),  # идентификатор события QuakeML
+    ("time", "datetime64[us]"),
+    ("magnitude", "f8"),
+    ("network", "U32"),
+    ("x", "f8"),
+    ("y", "f8"),
+    ("z", "f8"),
+])
+DETECTION_DTYPE = np.dtype([
+    ("event", "i8"),  # номер строки в массиве событий
+    ("phase", "u1"),  # Phase.value
+    ("time", "f8"),
+    ("station", "i8"),  # номер строки в массиве станций детекций
+])
+PICK_STATION_DTYPE = np.dtype([
+    ("station", "U32"),
+    ("network", "U32"),
+])
+
+# Ответ сервиса: путь к файлу или содержимое в памяти
+Payload = str | bytes | memoryview
+
+
+def open_payload(payload: Payload, text: bool = False) -> IO:
+    """
+    Открывает ответ сервиса на чтение независимо от того, где он хранится
+
+    :param payload: путь к файлу или содержимое
+    :param text: открыть в текстовом режиме (utf-8)
+    :return: файловый объект
+    """
+    if isinstance(payload, str):
+        return open(payload, encoding="utf-8") if text else open(payload, "rb")
+    if text:
+        return io.StringIO(bytes(payload).decode("utf-8"))
+    return io.BytesIO(payload)
+
+
+def payload_size(payload: Payload) -> int:
+    if isinstance(payload, str):
+        return os.path.getsize(payload)
+    return len(payload)
+
+
+def to_records(dtype: np.dtype, columns: dict[str, Sequence]) -> np.ndarray:
+    """
+    Собирает структурированный массив из колонок
+    """
+    lengths = {len(values) for values in columns.values()}
+    records = np.empty(lengths.pop() if lengths else 0, dtype=dtype)
+    for name in dtype.names:
+        records[name] = columns[name]
+    return records
+
+
+def save_records(directory: str, **arrays: np.ndarray) -> dict[str, str]:
+    """
+    Сохраняет массивы в .npy файлы для передачи между процессами без pickle
+
+    :param directory: директория для файлов
+    :param arrays: массивы по именам
+    :return: пути к файлам по именам
+    """
+    paths = {}
+    for name, array in arrays.items():
+        paths[name] = os.path.join(directory, f"{name}.npy")
+        np.save(paths[name], array, allow_pickle=False)
+    return paths
+
+
+def load_records(paths: dict[str, str]) -> dict[str, np.ndarray]:
+    """
+    Отображает в память массивы, сохраненные save_records
+    """
+    return {name: np.load(path, mmap_mode="r", allow_pickle=False) for name, path in paths.items()}
+
+
 def rename_station(title: str) -> str:
     names = {
         "SML04": "1",
@@ -34,91 +122,314 @@ def rename_station(title: str) -> str:
     return names.get(title, title)
 
 
-def stations(filepath: str) -> dict[str, list]:
-    inventory = read_inventory(filepath)
-
-    data = {
-        'station': [],
-        'network': [],
-        'x': [],
-        'y': [],
-        'z': []
-    }
-
-    for network in inventory:
-        for station in network:
-            data['station'].append(rename_station(station.code))
-            data['network'].append(network.code)
-            data['y'].append(station.latitude)
-            data['x'].append(station.longitude)
-            data['z'].append(station.elevation / 1000)
-
-    df = pd.DataFrame(data)
-    df['station'] = df['station'].astype(int)
-    df.sort_values(by='station', inplace=True)
+def station_sort_key(code: str) -> tuple[bool, int, str]:
+    """
+    Ключ сортировки станций: сначала числовые коды по значению, затем остальные
+    """
+    return (not code.isdigit(), int(code) if code.isdigit() else 0, code)
+
 
-    return df.to_dict(orient='list')
+def stations(payload: Payload) -> np.ndarray:
+    """
+    Читает станции из ответа FDSN station сервиса в формате text (level=station)
 
+    Строки вида Network|Station|Latitude|Longitude|Elevation|SiteName|StartTime|EndTime.
+    Для станции с несколькими эпохами берется последняя.
 
-def quake(filepath: str) -> tuple[
-    dict[str, tuple[datetime.datetime, float, str, float, float, float]],
-    dict[int, tuple[list[Phase, float, str]]]
-]:
-    events = {}
-    detections = {}
-
-    events_data: Iterable[Event] = read_events(filepath)
+    :param payload: путь к файлу или содержимое ответа
+    :return: станции STATION_DTYPE, отсортированные по коду станции
+    """
+    epochs = {}
+    with open_payload(payload, text=True) as file:
+        for line in file:
+            if not line.strip() or line.startswith("#"):
+                continue
+            network, station, latitude, longitude, elevation, _, start_time, *_ = line.rstrip("\r\n").split("|")
+            key = (network.strip(), station.strip())
+            if key in epochs and epochs[key][0] > start_time.strip():
+                continue
+            epochs[key] = (start_time.strip(), float(latitude), float(longitude), float(elevation))
+
+    rows = [
+        (rename_station(station), network, longitude, latitude, elevation / 1000)
+        for (network, station), (_, latitude, longitude, elevation) in epochs.items()
+    ]
+    rows.sort(key=lambda row: (station_sort_key(row[0]), row[1]))
+
+    return to_records(STATION_DTYPE, {
+        "station": [row[0] for row in rows],
+        "network": [row[1] for row in rows],
+        "x": [row[2] for row in rows],
+        "y": [row[3] for row in rows],
+        "z": [row[4] for row in rows],
+    })
+
+
+class QuakePick(NamedTuple):
+    network: str | None
+    station: str | None
+    channel: str | None
+    phase_hint: str | None
+    time: int  # нс от начала эпохи
+
+
+class QuakeOrigin(NamedTuple):
+    time: int  # нс от начала эпохи
+    latitude: float | None
+    longitude: float | None
+    depth: float | None
+
+
+class QuakeEvent(NamedTuple):
+    resource_id: str
+    origins: list[QuakeOrigin]
+    magnitudes: list[float | None]
+    picks: list[QuakePick]
+
+
+TIMESTAMP0 = datetime.datetime(1970, 1, 1)
+
+
+def ns_to_datetime(ns: int) -> datetime.datetime:
+    """
+    Время в нс от начала эпохи в datetime с тем же округлением, что и UTCDateTime.datetime
+    """
+    rounded_ns = round(ns, -3)
+    return TIMESTAMP0 + datetime.timedelta(seconds=rounded_ns // 10 ** 9, microseconds=rounded_ns % 10 ** 9 // 1000)
+
+
+def time_diff(first: int, second: int) -> float:
+    """
+    Разность времен в нс в секундах с тем же округлением, что и UTCDateTime.__sub__
+    """
+    return round((first - second) / 1e9, 6)
+
+
+def iso_to_ns(value: str) -> int:
+    """
+    Время QuakeML (ISO 8601, UTC) в нс от начала эпохи
+    """
+    value = value.strip()
+    offset = 0
+    if value.endswith(("Z", "z")):
+        value = value[:-1]
+    elif len(value) > 6 and value[-6] in "+-" and value[-3] == ":":
+        sign = 1 if value[-6] == "+" else -1
+        offset = sign * (int(value[-5:-3]) * 3600 + int(value[-2:]) * 60)
+        value = value[:-6]
+
+    value, _, fraction = value.partition(".")
+    moment = datetime.datetime.fromisoformat(value)
+    seconds = (moment - TIMESTAMP0) // datetime.timedelta(seconds=1) - offset
+    return seconds * 10 ** 9 + int(fraction[:9].ljust(9, "0") or 0)
+
+
+def _float(element: ElementTree.Element | None, path: str) -> float | None:
+    text = element.findtext(path) if element is not None else None
+    return float(text) if text is not None and text.strip() else None
+
+
+def _str(element: ElementTree.Element, path: str) -> str | None:
+    text = element.findtext(path)
+    return text.strip() if text is not None else None
+
+
+def _quakeml_event(element: ElementTree.Element) -> QuakeEvent:
+    picks = []
+    for pick in element.iterfind("{*}pick"):
+        waveform_id = pick.find("{*}waveformID")
+        picks.append(QuakePick(
+            network=waveform_id.get("networkCode") if waveform_id is not None else None,
+            station=waveform_id.get("stationCode") if waveform_id is not None else None,
+            channel=waveform_id.get("channelCode") if waveform_id is not None else None,
+            phase_hint=_str(pick, "{*}phaseHint"),
+            time=iso_to_ns(pick.findtext("{*}time/{*}value")),
+        ))
+
+    origins = [
+        QuakeOrigin(
+            time=iso_to_ns(origin.findtext("{*}time/{*}value")),
+            latitude=_float(origin, "{*}latitude/{*}value"),
+            longitude=_float(origin, "{*}longitude/{*}value"),
+            depth=_float(origin, "{*}depth/{*}value"),
+        )
+        for origin in element.iterfind("{*}origin")
+    ]
+    magnitudes = [_float(magnitude, "{*}mag/{*}value") for magnitude in element.iterfind("{*}magnitude")]
+
+    return QuakeEvent(
+        resource_id=element.get("publicID"),
+        origins=origins,
+        magnitudes=magnitudes,
+        picks=picks
+    )
+
+
+def read_quakeml(payload: Payload) -> Iterator[QuakeEvent]:
+    """
+    Потоково читает события QuakeML
+
+    Документ разбирается инкрементально, каждое событие удаляется из дерева
+    сразу после обработки, поэтому в памяти находится не больше одного события.
+    Извлекаются только поля, используемые при сопоставлении пиков.
+
+    :param payload: путь к QuakeML файлу или его содержимое
+    :return: события в порядке документа
+    """
+    parent = None
+    with open_payload(payload) as file:
+        for action, element in ElementTree.iterparse(file, events=("start", "end")):
+            tag = element.tag.rpartition("}")[2]
+            if action == "start":
+                if tag == "eventParameters":
+                    parent = element
+                continue
+            if tag != "event":
+                continue
+
+            yield _quakeml_event(element)
+            element.clear()
+            if parent is not None:
+                parent.remove(element)
+
+
+def read_quakeml_obspy(payload: Payload) -> Iterator[QuakeEvent]:
+    """
+    Читает события QuakeML через obspy
+
+    Эталонная реализация для проверки read_quakeml.
+
+    :param payload: путь к QuakeML файлу или его содержимое
+    :return: события в порядке документа
+    """
+    event: Event
+    with open_payload(payload) as file:
+        catalog = read_events(file)
+    for event in catalog:
+        yield QuakeEvent(
+            resource_id=event.resource_id.id,
+            origins=[
+                QuakeOrigin(
+                    time=origin.time.ns,
+                    latitude=origin.latitude,
+                    longitude=origin.longitude,
+                    depth=origin.depth
+                )
+                for origin in event.origins
+            ],
+            magnitudes=[magnitude.mag for magnitude in event.magnitudes],
+            picks=[
+                QuakePick(
+                    network=pick.waveform_id.network_code,
+                    station=pick.waveform_id.station_code,
+                    channel=pick.waveform_id.channel_code,
+                    phase_hint=pick.phase_hint,
+                    time=pick.time.ns
+                )
+                for pick in event.picks
+            ]
+        )
+
+
+QUAKEML_READERS = {
+    "stream": read_quakeml,
+    "obspy": read_quakeml_obspy,
+}
+
+
+def read_catalog(payloads: Iterable[Payload], parser: str = "stream") -> Iterator[QuakeEvent]:
+    """
+    Читает события из частей каталога без повторов
+
+    Части, полученные по соседним окнам времени, могут пересекаться на
+    границах, поэтому события отбрасываются по повторному идентификатору.
+    Пустые части (нет данных за окно) пропускаются.
+
+    :param payloads: пути к QuakeML файлам или их содержимое
+    :param parser: способ разбора: "stream" или эталонный "obspy"
+    :return: события в порядке частей
+    """
+    reader = QUAKEML_READERS[parser]
+    seen = set()
+    for payload in payloads:
+        if not payload_size(payload):
+            continue
+        for event in reader(payload):
+            if event.resource_id in seen:
+                continue
+            seen.add(event.resource_id)
+            yield event
+
+
+def quake(payloads: list[Payload], parser: str = "stream") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Сопоставляет пики HHN одной станции внутри события
+
+    Для каждой станции (сеть, код) запоминается первый пик HHN, каждый следующий
+    пик HHN этой станции дает пару детекций (первый пик, текущий пик).
+
+    :param payloads: пути к QuakeML файлам или их содержимое
+    :param parser: способ разбора: "stream" или эталонный "obspy"
+    :return: события EVENT_DTYPE, детекции DETECTION_DTYPE и станции детекций PICK_STATION_DTYPE
+    """
+    events = {"event": [], "public_id": [], "time": [], "magnitude": [], "network": [], "x": [], "y": [], "z": []}
+    detections = {"event": [], "phase": [], "time": [], "station": []}
+    pick_stations = {"station": [], "network": []}
+    station_index = {}
+
+    events_data: Iterable[QuakeEvent] = read_catalog(payloads, parser)
     for index, event in enumerate(events_data):
         if len(event.picks) % 3 != 0:
             raise ValueError("Длина не делится на 3 без остатка. Ошибка.")
-        elif len(event.origins) == 1:
-            prev_station = []
-            I = []
-            for i in range(len(event.picks)):
-                if event.picks[i].waveform_id.channel_code == 'HHN':
-                    time_origin = event.origins[0].time
-
-                    if not prev_station:
-                        prev_station.append(event.picks[i].waveform_id.station_code)
-                        I.append(i)
-
-                    else:
-                        current_station = event.picks[i].waveform_id.station_code
-                        search_station_equal = np.where(np.array(prev_station) == current_station)[0]
-                        if len(search_station_equal) > 0:
-                            INDEX = search_station_equal[0]
-
-                            event_name = index
-                            network = event.picks[I[INDEX]].waveform_id.network_code
-                            x = event.origins[0].longitude
-                            y = event.origins[0].latitude
-                            z = event.origins[0].depth
-                            magnitude = event.magnitudes[0].mag
-
-                            events[event_name] = (time_origin.datetime, magnitude, network, x, y, z)
-
-                            phase = Phase.P if event.picks[I[INDEX]].phase_hint == "P" else Phase.S
-                            time = np.round(np.abs(time_origin - event.picks[I[INDEX]].time), 4)
-
-                            if event_name not in detections:
-                                detections[event_name] = [(phase, time, rename_station(current_station))]
-                            else:
-                                detections[event_name].append((phase, time, rename_station(current_station)))
-
-                            # Add data for the current pick
-                            phase = Phase.P if event.picks[i].phase_hint == "P" else Phase.S
-                            time = np.round(np.abs(time_origin - event.picks[i].time), 4)
-
-                            detections[event_name].append((phase, time, rename_station(current_station)))
-
-                            prev_station.append(event.picks[i].waveform_id.station_code)
-                            I.append(i)
-
-                        else:
-                            prev_station.append(event.picks[i].waveform_id.station_code)
-                            I.append(i)
-
-    return events, detections
+        elif len(event.origins) != 1:
+            continue
+
+        origin = event.origins[0]
+        row = len(events["event"])
+        network = None
+        paired = False
+        first_pick = {}
+        for i, pick in enumerate(event.picks):
+            if pick.channel != 'HHN':
+                continue
+
+            # Станции разных сетей могут иметь одинаковые коды
+            key = (pick.network, pick.station)
+            first = first_pick.setdefault(key, i)
+            if first == i:
+                continue
+
+            if key not in station_index:
+                station_index[key] = len(pick_stations["station"])
+                pick_stations["station"].append(rename_station(pick.station))
+                pick_stations["network"].append(pick.network or "")
+
+            paired = True
+            network = event.picks[first].network
+            for item in (event.picks[first], pick):
+                detections["event"].append(row)
+                detections["phase"].append(Phase.P.value if item.phase_hint == "P" else Phase.S.value)
+                detections["time"].append(time_diff(origin.time, item.time))
+                detections["station"].append(station_index[key])
+
+        if paired:
+            events["event"].append(index)
+            events["public_id"].append(event.resource_id)
+            events["time"].append(ns_to_datetime(origin.time))
+            events["magnitude"].append(event.magnitudes[0])
+            events["network"].append(network)
+            events["x"].append(origin.longitude)
+            events["y"].append(origin.latitude)
+            events["z"].append(origin.depth)
+
+    return (
+        to_records(EVENT_DTYPE, events),
+        to_records(DETECTION_DTYPE, {
+            **detections,
+            "time": np.round(np.abs(np.asarray(detections["time"], dtype=np.float64)), 4),
+        }),
+        to_records(PICK_STATION_DTYPE, pick_stations)
+    )
 
 
 """
@@ -10,7 +10,13 @@ async def get_services(request: Request) -> ServiceFactory:
     yield ServiceFactory(
         data_queue=global_scope.data_queue,
         tomography_queue=global_scope.tomography_queue,
+        sweep_queue=global_scope.sweep_queue,
         lazy_session=global_scope.db_session,
         config=global_scope.config,
-        storage=global_scope.storage
+        storage=global_scope.storage,
+        fdsn_cache=global_scope.fdsn_cache,
+        start_model_cache=global_scope.start_model_cache,
+        http_client=global_scope.http_client,
+        solver=global_scope.solver,
+        pipeline_stats=global_scope.pipeline_stats
     )
@@ -1,33 +1,57 @@
+import asyncio
+import datetime
+import logging
+import uuid
+
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
+from geo.config import Config
+
 from geo.exceptions import NotFound, BadRequest
 from geo.models.schemas import TaskID, TaskState, TaskStep
-from geo.models.schemas.seisdata import SeisData
+from geo.models.schemas.seisdata import SeisData, SeisDataRefresh
 from geo.models.schemas.event import Event
 from geo.models.schemas.station import Station
-from geo.models.schemas.tomography import Tomography
+from geo.models.schemas.sweep import Sweep, SweepVariant, TomographySweep
+from geo.models.schemas.tomography import Tomography, TomographyResult
 from geo.repositories import TaskRepo
 from geo.repositories.event import EventRepo
 from geo.repositories.seisdata import SeisDataRepo
 from geo.repositories.station import StationRepo
+from geo.repositories.sweep import SweepRepo, SweepVariantRepo
 from geo.repositories.tomography import TomographyRepo
 from geo.services.storage import FileStorage
+from geo.services.tomography_proc.solver import SolverManager
+from geo.services.tomography_proc.utils import residual_summary
 from geo.utils.queue import Queue
 
 
+def _naive_utc(value: datetime.datetime) -> datetime.datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(datetime.UTC).replace(tzinfo=None)
+
+
 class GeoApplicationService:
 
     def __init__(
             self,
             data_queue: Queue,
             tomography_queue: Queue,
+            sweep_queue: Queue,
             lazy_session: async_sessionmaker[AsyncSession],
-            storage: FileStorage
+            storage: FileStorage,
+            solver: SolverManager,
+            config: Config
     ):
         self._seisdata_queue = data_queue
         self._tomography_queue = tomography_queue
+        self._sweep_queue = sweep_queue
         self._lazy_session = lazy_session
         self._storage = storage
+        self._solver = solver
+        self._config = config
 
     async def seisdata(self, task_id: TaskID) -> SeisData:
         async with self._lazy_session() as session:
@@ -37,13 +61,13 @@ class GeoApplicationService:
             raise NotFound(f"Данные задачи с task_id {task_id!r} не существуют")
         return SeisData.model_validate(seisdata)
 
-    async def tomography(self, task_id: TaskID) -> Tomography:
+    async def tomography(self, task_id: TaskID) -> TomographyResult:
         async with self._lazy_session() as session:
             tomography_repo = TomographyRepo(session)
             tomography = await tomography_repo.get(task_id=task_id)
         if not tomography:
             raise NotFound(f"Данные задачи с task_id {task_id!r} не существуют")
-        return Tomography.model_validate(tomography)
+        return TomographyResult.model_validate(tomography)
 
     async def seisdata_proc(self, task_id: TaskID, data: SeisData):
         async with self._lazy_session() as session:
@@ -57,9 +81,35 @@ class GeoApplicationService:
             if task.state != TaskState.PLAIN:
                 raise BadRequest(f"Задача с id {task_id!r} уже находится в обработке или завершена")
 
-            await seisdata_repo.create(**data.model_dump(), task_id=task_id)
+            await seisdata_repo.create(
+                **data.model_dump(exclude={"network"}),
+                network=",".join(data.network),
+                task_id=task_id
+            )
             await task_repo.update(id=task_id, state=TaskState.IN_PROGRESS)
-            self._seisdata_queue.enqueue(task_id)
+            self._seisdata_queue.enqueue((task_id, None))
+
+    async def seisdata_refresh(self, task_id: TaskID, data: SeisDataRefresh):
+        async with self._lazy_session() as session:
+            task_repo = TaskRepo(session)
+            seisdata_repo = SeisDataRepo(session)
+            task = await task_repo.get(id=task_id)
+
+            if not task:
+                raise NotFound(f"Задача с id {task_id!r} не существует")
+
+            if task.state != TaskState.PENDING or task.step != TaskStep.SEISDATA:
+                raise BadRequest(f"Данные задачи с id {task_id!r} не загружены или задача уже в обработке")
+
+            seisdata = await seisdata_repo.get(task_id=task_id)
+            end_time = data.end_time or datetime.datetime.now(datetime.UTC)
+            if _naive_utc(end_time) <= _naive_utc(seisdata.end_time):
+                raise BadRequest(f"Время окончания должно быть позже {seisdata.end_time}")
+
+            # Время окончания записывает воркер после успешной загрузки,
+            # в том же виде, в каком оно читается из БД
+            await task_repo.update(id=task_id, state=TaskState.IN_PROGRESS)
+            self._seisdata_queue.enqueue((task_id, _naive_utc(end_time)))
 
     async def tomography_proc(self, task_id: TaskID, data: Tomography):
         async with self._lazy_session() as session:
@@ -77,6 +127,126 @@ class GeoApplicationService:
             await task_repo.update(id=task_id, state=TaskState.IN_PROGRESS)
             self._tomography_queue.enqueue(task_id)
 
+    async def tomography_sweep(self, task_id: TaskID, data: TomographySweep) -> Sweep:
+        combinations = data.variants()
+        if len(combinations) > self._config.SWEEP_MAX_VARIANTS:
+            raise BadRequest(
+                f"Количество вариантов {len(combinations)} больше допустимого {self._config.SWEEP_MAX_VARIANTS}"
+            )
+
+        base = data.base.model_dump()
+        try:
+            variants = [Tomography.model_validate({**base, **parameters}) for parameters in combinations]
+        except ValidationError as error:
+            raise BadRequest(f"Недопустимые значения параметров: {error.errors()[0]['msg']}")
+
+        async with self._lazy_session() as session:
+            task_repo = TaskRepo(session)
+            tomography_repo = TomographyRepo(session)
+            sweep_repo = SweepRepo(session)
+            sweep_variant_repo = SweepVariantRepo(session)
+            task = await task_repo.get(id=task_id)
+
+            if not task:
+                raise NotFound(f"Задача с id {task_id!r} не существует")
+
+            if task.state != TaskState.PENDING or task.step != TaskStep.SEISDATA:
+                raise BadRequest(f"Данные задачи с id {task_id!r} не загружены или задача уже в обработке")
+
+            # Каждый вариант - отдельная задача, поэтому для него работают
+            # прогресс, отмена, выгрузка результатов и кэш результатов
+            sweep = await sweep_repo.create(
+                id=uuid.uuid4(),
+                base=base,
+                parameters=data.parameters,
+                task_id=task_id,
+                commit=False
+            )
+            for parameters, variant in zip(combinations, variants):
+                variant_task = await task_repo.create(
+                    id=uuid.uuid4(),
+                    state=TaskState.IN_PROGRESS,
+                    created_at=datetime.datetime.now(tz=datetime.UTC),
+                    commit=False
+                )
+                await tomography_repo.create(**variant.model_dump(), task_id=variant_task.id, commit=False)
+                await sweep_variant_repo.create(
+                    sweep_id=sweep.id,
+                    task_id=variant_task.id,
+                    parameters=parameters,
+                    commit=False
+                )
+            await session.commit()
+
+        self._sweep_queue.enqueue(sweep.id)
+        return await self.sweep(sweep.id)
+
+    async def sweep(self, sweep_id: uuid.UUID) -> Sweep:
+        async with self._lazy_session() as session:
+            sweep = await SweepRepo(session).get(id=sweep_id)
+            if not sweep:
+                raise NotFound(f"Перебор с id {sweep_id!r} не существует")
+            variants = await SweepVariantRepo(session).get_all_by_sweep(sweep_id)
+
+        result = []
+        for variant in variants:
+            task = variant.task
+            residuals = None
+            if task.state == TaskState.DONE and await self._storage.exists(f"{task.id}/output.h5"):
+                try:
+                    residuals = await asyncio.to_thread(
+                        residual_summary,
+                        self._storage.abs_path(f"{task.id}/output.h5")
+                    )
+                except (OSError, KeyError) as error:
+                    logging.warning(f"Не удалось прочитать невязки задачи {task.id!r}: {error!r}")
+            result.append(
+                SweepVariant(
+                    task_id=task.id,
+                    parameters=variant.parameters,
+                    state=task.state,
+                    progress=task.progress,
+                    cached_from=task.tomography.cached_from if task.tomography else None,
+                    residuals=residuals
+                )
+            )
+        return Sweep(
+            id=sweep.id,
+            task_id=sweep.task_id,
+            parameters=sweep.parameters,
+            created_at=sweep.created_at,
+            variants=result
+        )
+
+    async def tomography_cancel(self, task_id: TaskID):
+        async with self._lazy_session() as session:
+            task_repo = TaskRepo(session)
+            tomography_repo = TomographyRepo(session)
+            task = await task_repo.get(id=task_id)
+
+            if not task:
+                raise NotFound(f"Задача с id {task_id!r} не существует")
+
+            if task.state != TaskState.IN_PROGRESS or not await tomography_repo.get(task_id=task_id):
+                raise BadRequest(f"Томография задачи с id {task_id!r} не выполняется")
+
+            # Вариант перебора, который еще в очереди: вариант будет пропущен
+            # при подготовке перебора
+            variant = await SweepVariantRepo(session).get(task_id=task_id)
+            queued = variant is not None and variant.sweep_id in self._sweep_queue
+
+            # Задача еще в очереди - процесс не запускался
+            if self._tomography_queue.remove(task_id) or queued:
+                await task_repo.update(
+                    id=task_id,
+                    state=TaskState.FAILED,
+                    completed_in=datetime.datetime.now(datetime.UTC)
+                )
+                return
+
+        # Иначе задачу завершит воркер, когда процесс будет остановлен
+        await self._solver.cancel(task_id)
+
     async def events(self, task_id: TaskID) -> list[Event]:
         async with self._lazy_session() as session:
             event_repo = EventRepo(session)
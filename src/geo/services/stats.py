@@ -1,10 +1,33 @@
+from geo.services.cache import FDSNCache, StartModelCache
+from geo.services.tomography_proc.solver import SolverManager
+from geo.utils.http import HttpProcessor
+from geo.utils.pipeline import PipelineStats
+
 
 class StatsApplicationService:
 
-    def __init__(self, config):
+    def __init__(
+            self,
+            config,
+            fdsn_cache: FDSNCache,
+            start_model_cache: StartModelCache,
+            http_client: HttpProcessor,
+            solver: SolverManager,
+            pipeline_stats: PipelineStats
+    ):
         self._config = config
+        self._fdsn_cache = fdsn_cache
+        self._start_model_cache = start_model_cache
+        self._http_client = http_client
+        self._solver = solver
+        self._pipeline_stats = pipeline_stats
 
     async def get_stats(self) -> dict:
         return {
             "ping": "ok",
+            "fdsn_cache": self._fdsn_cache.stats(),
+            "start_model_cache": self._start_model_cache.stats(),
+            "http": self._http_client.stats.stats(),
+            "seisdata_pipeline": self._pipeline_stats.stats(),
+            "solver": self._solver.stats(),
         }
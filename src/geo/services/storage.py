@@ -1,5 +1,7 @@
+import asyncio
 import os
 import pathlib
+import shutil
 from typing import AsyncGenerator, Literal
 
 import aiofiles
@@ -52,6 +54,24 @@ class FileStorage:
             while chunk := await f.read(self.chunk_size):
                 yield chunk
 
+    async def link(self, source: os.PathLike | str, filepath: os.PathLike | str) -> str:
+        """
+        Создает жесткую ссылку на файл хранилища, а если это невозможно - копию
+
+        :param source: исходный файл внутри хранилища
+        :param filepath: новый файл внутри хранилища
+        :return: абсолютный путь к новому файлу
+        """
+        source, path = self.abs_path(source), self.abs_path(filepath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(source, path)
+        except OSError:
+            await asyncio.to_thread(shutil.copyfile, source, path)
+        return path
+
     async def delete(self, filepath: os.PathLike | str) -> None:
         os.remove(os.path.join(self.path, filepath))
 
@@ -1,70 +1,218 @@
+import asyncio
 import datetime
 import logging
-import subprocess
+import os
+import shutil
+from dataclasses import dataclass
 
 import h5py
 import numpy as np
-from aiomultiprocess import Worker
+from aiomultiprocess import Pool
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
-from geo.models.schemas import TaskState, TaskStep, Phase
+from geo.config import Config
+from geo.models import tables
+from geo.models.schemas import TaskID, TaskState, TaskStep, Phase, Tomography
 from geo.repositories import TaskRepo
 from geo.repositories.detection import DetectionRepo
 from geo.repositories.event import EventRepo
+from geo.repositories.seisdata import SeisDataRepo
 from geo.repositories.station import StationRepo
+from geo.repositories.sweep import SweepRepo, SweepVariantRepo
 from geo.repositories.tomography import TomographyRepo
+from geo.services.cache import StartModelCache
 from geo.services.storage import FileStorage
-from geo.services.tomography_proc.utils import change_coords_to_ST3D, relief_read, create_start_model, to_vtk
+from geo.services.tomography_proc.solver import SolverManager, SolverCancelled, SolverTimeout, estimate_cost
+from geo.services.tomography_proc.utils import (
+    change_coords_to_ST3D,
+    dataset_digests,
+    input_attrs,
+    input_hash,
+    patch_input,
+    relief_read,
+    save_start_model,
+    task_bbox,
+    to_vtk
+)
 from geo.utils.queue import Queue
 
 
-async def cpu_worker(executable: str, input_file: str, output_file: str):
+async def solve(
+        solver: SolverManager,
+        lazy_session: async_sessionmaker[AsyncSession],
+        storage: FileStorage,
+        task_id: TaskID,
+        executable: str,
+        input_file: str,
+        output_file: str,
+        iter_max: int,
+        timeout: float = None,
+        cost: float = None
+) -> bool:
+    """
+    Запускает решатель HPS_ST3D, записывая его вывод в лог задачи, а ход итераций - в задачу
+
+    :param solver: менеджер процессов решателя
+    :param lazy_session: фабрика сессий БД
+    :param storage: файловое хранилище
+    :param task_id: идентификатор задачи
+    :param executable: исполняемый файл решателя
+    :param input_file: входной файл
+    :param output_file: выходной файл
+    :param iter_max: количество итераций
+    :param timeout: ограничение времени выполнения в секундах
+    :param cost: оценка трудоемкости (estimate_cost)
+    :return: решатель завершился успешно
+    """
+
+    async def on_progress(iteration: int) -> None:
+        async with lazy_session() as session:
+            await TaskRepo(session).update(id=task_id, progress=min(iteration / max(iter_max, 1), 1.0))
+
     logging.info(f"[TomographyProc] Запуск процесса {input_file!r} -> {output_file!r}")
-    is_ok = False
     try:
-        subprocess.run(
+        returncode = await solver.run(
+            task_id,
             [executable, input_file, output_file],
-            check=True,
+            log_path=storage.abs_path(f"{task_id}/solver.log"),
+            timeout=timeout,
+            on_progress=on_progress,
+            cost=cost
         )
-        is_ok = True
-    except subprocess.CalledProcessError as error:
-        logging.error(error)
+    except (SolverCancelled, SolverTimeout) as error:
+        logging.error(f"[TomographyProc] {error}")
+        return False
+    except Exception as error:
+        # Например, не найден исполняемый файл решателя или команды запуска
+        logging.error(f"[TomographyProc] Ошибка запуска процесса {input_file!r}: {error!r}", exc_info=error)
+        return False
+    if returncode:
+        logging.error(f"[TomographyProc] Процесс {input_file!r} завершился с кодом {returncode}")
+        return False
     logging.info(f"[TomographyProc] Процесс {input_file!r} завершен")
-    return is_ok
-
-
-async def worker(queue: Queue, lazy_session: async_sessionmaker[AsyncSession], storage: FileStorage, executable: str):
-    task_id = queue.dequeue()
-    if not task_id:
-        return
-
-    logging.info(f"[TomographyProc] Получена задача с id {task_id!r}")
+    return True
+
+
+async def start_model_worker(base_model: list[list[float]], grid_size: list[int], path: str) -> str:
+    return save_start_model(base_model, grid_size, path)
+
+
+async def start_model(
+        storage: FileStorage,
+        cache: StartModelCache,
+        process_pool: Pool,
+        directory: str,
+        base_model: list[list[float]],
+        grid_size: list[int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Возвращает стартовую модель из кэша или строит ее в пуле процессов
+
+    :param storage: файловое хранилище
+    :param cache: кэш стартовых моделей
+    :param process_pool: пул процессов
+    :param directory: рабочая директория внутри хранилища
+    :param base_model: одномерная модель
+    :param grid_size: размер сетки
+    :return: (Vp, Vs)
+    """
+    models = await cache.get_model(base_model, grid_size)
+    if models is not None:
+        logging.info(f"[TomographyProc] Стартовая модель для {directory!r} взята из кэша")
+        return models
+
+    filepath = f"{directory}/start_model.npy"
+    os.makedirs(os.path.dirname(storage.abs_path(filepath)), exist_ok=True)
+    path = await process_pool.apply(
+        start_model_worker,
+        args=(base_model, grid_size, storage.abs_path(filepath))
+    )
+    try:
+        return await cache.put_model(base_model, grid_size, path)
+    finally:
+        await storage.delete(filepath)
+
+
+async def input_hash_worker(input_file: str, executable: str, datasets: dict[str, str] = None) -> str:
+    return input_hash(input_file, executable, datasets)
+
+
+async def dataset_digests_worker(input_file: str) -> dict[str, str]:
+    return dataset_digests(input_file)
+
+
+async def reuse_result(storage: FileStorage, source_id: TaskID, task_id: TaskID) -> bool:
+    """
+    Переносит результат задачи с тем же входным файлом в новую задачу
+
+    :param storage: файловое хранилище
+    :param source_id: идентификатор завершенной задачи
+    :param task_id: идентификатор новой задачи
+    :return: результат перенесен
+    """
+    for name in ("output.h5", "model.vtk"):
+        if not await storage.exists(f"{source_id}/{name}"):
+            return False
+    for name in ("output.h5", "model.vtk", "solver.log"):
+        if await storage.exists(f"{source_id}/{name}"):
+            await storage.link(f"{source_id}/{name}", f"{task_id}/{name}")
+    return True
+
+
+@dataclass
+class PreparedInput:
+    X_Y_Z_rcvrs: np.ndarray
+    X_Y_Z_srcs: np.ndarray
+    LIM_COORD: np.ndarray
+    rays: int
+
+
+async def prepare_input(
+        lazy_session: async_sessionmaker[AsyncSession],
+        storage: FileStorage,
+        start_model_cache: StartModelCache,
+        process_pool: Pool,
+        config: Config,
+        source_id: TaskID,
+        data: tables.Tomography | Tomography,
+        directory: str
+) -> PreparedInput:
+    """
+    Записывает входной файл HPS_ST3D по данным задачи в {directory}/input.h5
+
+    :param lazy_session: фабрика сессий БД
+    :param storage: файловое хранилище
+    :param start_model_cache: кэш стартовых моделей
+    :param process_pool: пул процессов
+    :param config: конфигурация
+    :param source_id: идентификатор задачи с загруженными данными
+    :param data: параметры томографии
+    :param directory: рабочая директория внутри хранилища
+    :return: данные, нужные для экспорта результата
+    :raises ValueError: область задачи вне файла рельефа
+    """
     async with lazy_session() as session:
-        task_repo = TaskRepo(session)
-        tomography_repo = TomographyRepo(session)
-
-        task = await task_repo.get(id=task_id)
-        if not task:
-            logging.error(f"[TomographyProc] Задача с id {task_id!r} не существует")
-            await task_repo.update(
-                id=task_id,
-                state=TaskState.FAILED,
-                completed_in=datetime.datetime.now(datetime.UTC)
-            )
-            return
-
-        data = await tomography_repo.get(task_id=task_id)
-        if not data:
-            logging.error(f"[TomographyProc] Данные задачи с task_id {task_id!r} не существуют")
-            await task_repo.update(
-                id=task_id,
-                state=TaskState.FAILED,
-                completed_in=datetime.datetime.now(datetime.UTC)
-            )
-            return
+        event_repo = EventRepo(session)
+        station_repo = StationRepo(session)
+        detection_repo = DetectionRepo(session)
+        seisdata = await SeisDataRepo(session).get(task_id=source_id)
+        # Координаты читаются в том же порядке, в котором нумеруются
+        # события и станции вступлений
+        events = await event_repo.get_coords_by_task(task_id=source_id)
+        stations = await station_repo.get_coords_by_task(task_id=source_id)
+        detections = await detection_repo.get_columns_by_task(
+            task_id=source_id
+        )
 
+    # Рельеф читается только для области задачи
+    bbox = task_bbox(
+        seisdata,
+        latitudes=np.concatenate((events["y"], stations["y"])),
+        longitudes=np.concatenate((events["x"], stations["x"])),
+        margin=config.RELIEF_MARGIN
+    )
     relief_path = storage.abs_path("relief.dat")
-    x_middle, y_middle, depth_topography, X_Y_Z_relief = relief_read(relief_path, data.grid_size)
+    x_middle, y_middle, depth_topography, X_Y_Z_relief = relief_read(relief_path, data.grid_size, bbox)
 
     LIM_COORD = X_Y_Z_relief[:3]
     MAX_COORD = X_Y_Z_relief[3:]
@@ -72,54 +220,26 @@ async def worker(queue: Queue, lazy_session: async_sessionmaker[AsyncSession], s
     LIM_COORD[2] = -1
     MAX_COORD[2] = 60
 
-    async with lazy_session() as session:
-        event_repo = EventRepo(session)
-        station_repo = StationRepo(session)
-        detection_repo = DetectionRepo(session)
-        events = await event_repo.get_all(
-            task_id=task_id
-        )
-        stations = await station_repo.get_all(
-            task_id=task_id
-        )
-        detections = await detection_repo.get_all_by_task(
-            task_id=task_id
-        )
-
-    events_x = [event.x for event in events]
-    events_y = [event.y for event in events]
-    events_z = [event.z for event in events]
+    is_p = detections["phase"] == Phase.P.value
+    is_s = detections["phase"] == Phase.S.value
 
-    stations_x = [station.x for station in stations]
-    stations_y = [station.y for station in stations]
-    stations_z = [station.z for station in stations]
+    p_obs_time = detections["time"][is_p]
+    s_obs_time = detections["time"][is_s]
 
-    p_times = [detection.time for detection in detections if detection.phase == Phase.P]
-    s_times = [detection.time for detection in detections if detection.phase == Phase.S]
-
-    p_obs_time = np.asarray(p_times, dtype=np.float64)
-    s_obs_time = np.asarray(s_times, dtype=np.float64)
-
-    events_df = np.asarray(
-        [detection.event.event for detection in detections if detection.phase == Phase.P],
-        dtype=np.float64
-    )
-    stations_df = np.asarray(
-        [detection.station.station for detection in detections if detection.phase == Phase.P],
-        dtype=np.float64
-    )
+    events_df = detections["event"][is_p]
+    stations_df = detections["station"][is_p]
 
     x_event, y_event, z_event = change_coords_to_ST3D(
-        FI=np.array(events_x, dtype=np.float64),
-        TET=np.array(events_y, dtype=np.float64),
-        h=np.array(events_z, dtype=np.float64),
+        FI=events["x"],
+        TET=events["y"],
+        h=events["z"],
         fi0=y_middle,
         tet0=x_middle
     )
     x_station, y_station, z_station = change_coords_to_ST3D(
-        FI=np.array(stations_x, dtype=np.float64),
-        TET=np.array(stations_y, dtype=np.float64),
-        h=np.array(stations_z, dtype=np.float64),
+        FI=stations["x"],
+        TET=stations["y"],
+        h=stations["z"],
         fi0=y_middle,
         tet0=x_middle
     )
@@ -127,36 +247,22 @@ async def worker(queue: Queue, lazy_session: async_sessionmaker[AsyncSession], s
     X_Y_Z_srcs = np.column_stack((x_event, y_event, z_event))
     X_Y_Z_rcvrs = np.column_stack((x_station, y_station, z_station))
 
-    input_file_path = storage.abs_path(f"{task_id}/input.h5")
-    output_file_path = storage.abs_path(f"{task_id}/output.h5")
-    await storage.save(input_file_path, "", "w")
+    Vp_st, Vs_st = await start_model(
+        storage,
+        start_model_cache,
+        process_pool,
+        directory,
+        data.base_model,
+        data.grid_size
+    )
+
+    input_file_path = storage.abs_path(f"{directory}/input.h5")
+    os.makedirs(os.path.dirname(input_file_path), exist_ok=True)
     with h5py.File(input_file_path, "w") as file:
         hps_st3d_group = file.create_group("HPS_ST3D")
         group_input = hps_st3d_group.create_group("Input")
-        group_input.attrs["IterMax"] = np.array([data.iter_max], dtype=np.int64)
-        group_input.attrs["IterResidLimits"] = np.full(np.int64(data.iter_max), 1.5, dtype=np.float64)
-        group_input.attrs["LinSysLSQRIterMax"] = np.array([data.lin_sys_LSQR_iter_max], dtype=np.int64)
-        group_input.attrs["ParamType"] = np.array([2], dtype=np.uint8)
-        group_input.attrs["SrcsPsvRelocLimit"] = np.array([40, 40, 40], dtype=np.float64)
-        group_input.attrs["TomoGridRotAngles"] = np.array([0, 22.5, 45, 67.5], dtype=np.float64)
-        group_input.attrs["TomoGridStep"] = np.array(data.grid_step, dtype=np.float64)
-
-        group_input.attrs["TomoMatDampingP"] = np.asarray([data.mat_damping_P], dtype=np.float64)
-        group_input.attrs["TomoMatDampingP4V"] = np.asarray([data.mat_damping_P4V], dtype=np.float64)
-        group_input.attrs["TomoMatDampingS"] = np.asarray([data.mat_damping_S], dtype=np.float64)
-        group_input.attrs["TomoMatDampingS4V"] = np.asarray([data.mat_damping_S4V], dtype=np.float64)
-        group_input.attrs["TomoMatSmoothHP"] = np.asarray([data.mat_damping_HP], dtype=np.float64)
-        group_input.attrs["TomoMatSmoothHP4V"] = np.asarray([data.mat_damping_HP4V], dtype=np.float64)
-        group_input.attrs["TomoMatSmoothHS"] = np.asarray([data.mat_damping_HS], dtype=np.float64)
-        group_input.attrs["TomoMatSmoothHS4V"] = np.asarray([data.mat_damping_HS4V], dtype=np.float64)
-        group_input.attrs["TomoMatSmoothVP"] = np.asarray([data.mat_damping_VP], dtype=np.float64)
-        group_input.attrs["TomoMatSmoothVP4V"] = np.asarray([data.mat_damping_VP4V], dtype=np.float64)
-        group_input.attrs["TomoMatSmoothVS"] = np.asarray([data.mat_damping_VS], dtype=np.float64)
-        group_input.attrs["TomoMatSmoothVS4V"] = np.asarray([data.mat_damping_VS4V], dtype=np.float64)
-
-        # Атрибуты "VLimitsP" и "VLimitsS"
-        group_input.attrs["VLimitsP"] = np.array(data.v_limits_p, dtype=np.float64)
-        group_input.attrs["VLimitsS"] = np.array(data.v_limits_s, dtype=np.float64)
+        for name, value in input_attrs(data).items():
+            group_input.attrs[name] = value
 
         # Группа "RaysPsv"
         group_rays_psv = group_input.create_group("RaysPsv")
@@ -204,18 +310,160 @@ async def worker(queue: Queue, lazy_session: async_sessionmaker[AsyncSession], s
             (Grid_Step[2]) / (data.grid_size[2] - 1)
         ], dtype=np.float64)
 
-        Vp_st, Vs_st = create_start_model(data.base_model, data.grid_size)
-
         # Датасеты "VP" и "VS"
         group_vgrid.create_dataset("VP", shape=Vp_st.shape, data=Vp_st, dtype='float64')
         group_vgrid.create_dataset("VS", shape=Vs_st.shape, data=Vs_st, dtype='float64')
 
-    # Запуск процесса
-    is_ok = await Worker(
-        target=cpu_worker,
-        args=(executable, input_file_path, output_file_path)
+    return PreparedInput(
+        X_Y_Z_rcvrs=X_Y_Z_rcvrs,
+        X_Y_Z_srcs=X_Y_Z_srcs,
+        LIM_COORD=LIM_COORD,
+        rays=len(detections["time"])
     )
-    if not is_ok:
+
+
+async def schedule(
+        solver: SolverManager,
+        lazy_session: async_sessionmaker[AsyncSession],
+        storage: FileStorage,
+        process_pool: Pool,
+        config: Config,
+        task_id: TaskID,
+        data: tables.Tomography,
+        prepared: PreparedInput,
+        datasets: dict[str, str] = None
+):
+    """
+    Переносит готовый результат с тем же входным файлом или ставит решение в очередь решателя
+
+    :param solver: менеджер процессов решателя
+    :param lazy_session: фабрика сессий БД
+    :param storage: файловое хранилище
+    :param process_pool: пул процессов
+    :param config: конфигурация
+    :param task_id: идентификатор задачи
+    :param data: параметры томографии задачи
+    :param prepared: результат prepare_input
+    :param datasets: готовые хэши датасетов входного файла (dataset_digests)
+    """
+    input_file_path = storage.abs_path(f"{task_id}/input.h5")
+    output_file_path = storage.abs_path(f"{task_id}/output.h5")
+
+    # Тот же входной файл и та же версия решателя дают тот же результат
+    data_hash = await process_pool.apply(
+        input_hash_worker,
+        args=(input_file_path, config.HPS_ST3D_EXEC, datasets)
+    )
+    async with lazy_session() as session:
+        tomography_repo = TomographyRepo(session)
+        await tomography_repo.update(id=data.id, input_hash=data_hash)
+        sources = await tomography_repo.get_all_done_by_hash(data_hash, exclude=task_id)
+
+    # Отмена, пришедшая во время подготовки: задачи уже нет в очереди,
+    # а решатель для нее еще не запускался
+    if solver.discard_cancelled(task_id):
+        logging.info(f"[TomographyProc] Задача {task_id!r} отменена до запуска решателя")
+        async with lazy_session() as session:
+            await TaskRepo(session).update(
+                id=task_id,
+                state=TaskState.FAILED,
+                completed_in=datetime.datetime.now(datetime.UTC)
+            )
+        return
+
+    # Файлы результата задачи могли быть удалены, тогда пробуется следующая
+    source_id = None
+    for source in sources:
+        if await reuse_result(storage, source.task_id, task_id):
+            source_id = source.task_id
+            break
+
+    if source_id:
+        logging.info(f"[TomographyProc] Результат задачи {task_id!r} взят из задачи {source_id!r}")
+        async with lazy_session() as session:
+            await TomographyRepo(session).update(id=data.id, cached_from=source_id, commit=False)
+            await TaskRepo(session).update(
+                id=task_id,
+                state=TaskState.DONE,
+                step=TaskStep.TOMOGRAPHY,
+                progress=1.0,
+                completed_in=datetime.datetime.now(datetime.UTC)
+            )
+        return
+
+    # Решение выполняется в фоне, чтобы следующие задачи готовились,
+    # пока для них есть свободные ядра
+    async with lazy_session() as session:
+        await TaskRepo(session).update(id=task_id, progress=0.0)
+    solver.submit(
+        finish(
+            solver,
+            lazy_session,
+            storage,
+            task_id,
+            config,
+            data,
+            input_file_path,
+            output_file_path,
+            prepared.X_Y_Z_rcvrs,
+            prepared.X_Y_Z_srcs,
+            prepared.LIM_COORD,
+            cost=estimate_cost(data.grid_size, prepared.rays, data.iter_max)
+        )
+    )
+
+
+async def worker(
+        queue: Queue,
+        lazy_session: async_sessionmaker[AsyncSession],
+        storage: FileStorage,
+        start_model_cache: StartModelCache,
+        process_pool: Pool,
+        solver: SolverManager,
+        config: Config
+):
+    task_id = queue.dequeue()
+    if not task_id:
+        return
+
+    logging.info(f"[TomographyProc] Получена задача с id {task_id!r}")
+    async with lazy_session() as session:
+        task_repo = TaskRepo(session)
+        tomography_repo = TomographyRepo(session)
+
+        task = await task_repo.get(id=task_id)
+        if not task:
+            logging.error(f"[TomographyProc] Задача с id {task_id!r} не существует")
+            await task_repo.update(
+                id=task_id,
+                state=TaskState.FAILED,
+                completed_in=datetime.datetime.now(datetime.UTC)
+            )
+            return
+
+        data = await tomography_repo.get(task_id=task_id)
+        if not data:
+            logging.error(f"[TomographyProc] Данные задачи с task_id {task_id!r} не существуют")
+            await task_repo.update(
+                id=task_id,
+                state=TaskState.FAILED,
+                completed_in=datetime.datetime.now(datetime.UTC)
+            )
+            return
+
+    try:
+        prepared = await prepare_input(
+            lazy_session,
+            storage,
+            start_model_cache,
+            process_pool,
+            config,
+            task_id,
+            data,
+            str(task_id)
+        )
+    except ValueError as error:
+        logging.error(f"[TomographyProc] Задача {task_id!r}: {error}")
         async with lazy_session() as session:
             task_repo = TaskRepo(session)
             await task_repo.update(
@@ -223,18 +471,178 @@ async def worker(queue: Queue, lazy_session: async_sessionmaker[AsyncSession], s
                 state=TaskState.FAILED,
                 completed_in=datetime.datetime.now(datetime.UTC)
             )
+        return
+
+    await schedule(solver, lazy_session, storage, process_pool, config, task_id, data, prepared)
+
+
+async def sweep_worker(
+        queue: Queue,
+        lazy_session: async_sessionmaker[AsyncSession],
+        storage: FileStorage,
+        start_model_cache: StartModelCache,
+        process_pool: Pool,
+        solver: SolverManager,
+        config: Config
+):
+    sweep_id = queue.dequeue()
+    if not sweep_id:
+        return
+
+    logging.info(f"[TomographyProc] Получен перебор с id {sweep_id!r}")
+    async with lazy_session() as session:
+        sweep = await SweepRepo(session).get(id=sweep_id)
+        if not sweep:
+            logging.error(f"[TomographyProc] Перебор с id {sweep_id!r} не существует")
+            return
+        variants = await SweepVariantRepo(session).get_all_by_sweep(sweep_id)
+
+    # Отмененные до начала перебора варианты пропускаются
+    variants = [
+        variant for variant in variants
+        if variant.task.state == TaskState.IN_PROGRESS and variant.task.tomography
+    ]
+    if not variants:
+        return
 
-    vtk_file_model = await storage.save(f"{task_id}/model.vtk", "", "w")
-    to_vtk(
+    # Данные задачи читаются и входной файл пишется один раз для базовых параметров
+    base = Tomography.model_validate(sweep.base)
+    directory = f"sweeps/{sweep_id}"
+    try:
+        try:
+            prepared = await prepare_input(
+                lazy_session,
+                storage,
+                start_model_cache,
+                process_pool,
+                config,
+                sweep.task_id,
+                base,
+                directory
+            )
+        except ValueError as error:
+            logging.error(f"[TomographyProc] Перебор {sweep_id!r}: {error}")
+            async with lazy_session() as session:
+                task_repo = TaskRepo(session)
+                for variant in variants:
+                    await task_repo.update(
+                        id=variant.task_id,
+                        state=TaskState.FAILED,
+                        completed_in=datetime.datetime.now(datetime.UTC),
+                        commit=False
+                    )
+                await session.commit()
+            return
+
+        # Варианты отличаются от базового файла только атрибутами,
+        # поэтому датасеты хэшируются один раз
+        base_attrs = input_attrs(base)
+        datasets = await process_pool.apply(
+            dataset_digests_worker,
+            args=(storage.abs_path(f"{directory}/input.h5"),)
+        )
+        for variant in variants:
+            data = variant.task.tomography
+            attrs = {
+                name: value
+                for name, value in input_attrs(data).items()
+                if not np.array_equal(value, base_attrs[name])
+            }
+            await asyncio.to_thread(
+                patch_input,
+                storage.abs_path(f"{directory}/input.h5"),
+                storage.abs_path(f"{variant.task_id}/input.h5"),
+                attrs
+            )
+            await schedule(
+                solver,
+                lazy_session,
+                storage,
+                process_pool,
+                config,
+                variant.task_id,
+                data,
+                prepared,
+                datasets
+            )
+    finally:
+        shutil.rmtree(storage.abs_path(directory), ignore_errors=True)
+
+
+async def finish(
+        solver: SolverManager,
+        lazy_session: async_sessionmaker[AsyncSession],
+        storage: FileStorage,
+        task_id: TaskID,
+        config: Config,
+        data: tables.Tomography,
+        input_file_path: str,
+        output_file_path: str,
+        X_Y_Z_rcvrs: np.ndarray,
+        X_Y_Z_srcs: np.ndarray,
+        LIM_COORD: np.ndarray,
+        cost: float
+):
+    """
+    Решение и экспорт результата задачи
+
+    :param solver: менеджер процессов решателя
+    :param lazy_session: фабрика сессий БД
+    :param storage: файловое хранилище
+    :param task_id: идентификатор задачи
+    :param config: конфигурация
+    :param data: параметры томографии задачи
+    :param input_file_path: входной файл
+    :param output_file_path: выходной файл
+    :param X_Y_Z_rcvrs: координаты станций
+    :param X_Y_Z_srcs: координаты событий
+    :param LIM_COORD: нижняя граница сетки
+    :param cost: оценка трудоемкости (estimate_cost)
+    """
+    is_ok = await solve(
+        solver,
+        lazy_session,
+        storage,
+        task_id,
+        config.HPS_ST3D_EXEC,
         input_file_path,
         output_file_path,
-        vtk_file_model,
-        data.grid_size,
-        X_Y_Z_rcvrs,
-        X_Y_Z_srcs,
-        data.grid_step,
-        LIM_COORD
+        data.iter_max,
+        timeout=config.SOLVER_TIMEOUT or None,
+        cost=cost
     )
+    if not is_ok:
+        async with lazy_session() as session:
+            task_repo = TaskRepo(session)
+            await task_repo.update(
+                id=task_id,
+                state=TaskState.FAILED,
+                completed_in=datetime.datetime.now(datetime.UTC)
+            )
+        return
+
+    try:
+        vtk_file_model = await storage.save(f"{task_id}/model.vtk", "", "w")
+        to_vtk(
+            input_file_path,
+            output_file_path,
+            vtk_file_model,
+            data.grid_size,
+            X_Y_Z_rcvrs,
+            X_Y_Z_srcs,
+            data.grid_step,
+            LIM_COORD
+        )
+    except Exception as error:
+        logging.error(f"[TomographyProc] Ошибка экспорта результата задачи {task_id!r}: {error!r}", exc_info=error)
+        async with lazy_session() as session:
+            task_repo = TaskRepo(session)
+            await task_repo.update(
+                id=task_id,
+                state=TaskState.FAILED,
+                completed_in=datetime.datetime.now(datetime.UTC)
+            )
+        return
 
     async with lazy_session() as session:
         task_repo = TaskRepo(session)
@@ -243,5 +651,6 @@ async def worker(queue: Queue, lazy_session: async_sessionmaker[AsyncSession], s
             id=task_id,
             state=TaskState.DONE,
             step=TaskStep.TOMOGRAPHY,
+            progress=1.0,
             completed_in=datetime.datetime.now(datetime.UTC)
         )
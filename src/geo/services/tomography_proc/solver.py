@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import shlex
+import signal
+from collections import deque
+from typing import Awaitable, Callable, Coroutine
+
+import aiofiles
+
+from geo.models.schemas import TaskID
+
+# Размер порции чтения вывода решателя: строки вывода не ограничены по длине
+STREAM_CHUNK = 64 * 1024
+
+# Номер итерации в выводе решателя. HPS_ST3D называет итерации так же, как
+# группы выходного файла: "Iter_2" (HPS_ST3D/Iter_2 читает to_vtk), а также
+# "Iter 2", "Iteration: 2", "ITER=2". Имена параметров вроде "IterMax = 10"
+# и "Iterations: 10" не совпадают: после "iter" допускаются только разделители
+ITERATION_PATTERN = re.compile(rb"\biter(?:ation)?[\s_:=#]*(\d+)", re.IGNORECASE)
+
+
+class SolverCancelled(Exception):
+    pass
+
+
+class SolverTimeout(Exception):
+    pass
+
+
+def estimate_cost(grid_size: list[int], rays: int, iter_max: int) -> float:
+    """
+    Оценка трудоемкости решения
+
+    На каждой итерации каждый луч трассируется через сетку (порядка суммы
+    ее размеров ячеек), а модель обновляется во всех ячейках.
+
+    :param grid_size: размер сетки
+    :param rays: количество лучей
+    :param iter_max: количество итераций
+    :return: оценка в операциях луч-ячейка
+    """
+    return max(iter_max, 1) * (rays * sum(grid_size) + math.prod(grid_size))
+
+
+class CoreBudget:
+
+    def __init__(self, cores: list[int]):
+        """
+        Распределение ядер между процессами решателя
+
+        Запросы обслуживаются по очереди: следующий ждет, пока не освободится
+        минимально необходимое ему количество ядер.
+
+        :param cores: номера доступных ядер
+        """
+        self.cores = sorted(cores)
+        self._free = set(self.cores)
+        self._waiters: deque[object] = deque()
+        self._changed = asyncio.Condition()
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
+
+    async def acquire(self, desired: int, minimum: int = 1) -> list[int]:
+        """
+        Занимает ядра
+
+        :param desired: желаемое количество ядер
+        :param minimum: минимальное количество ядер, с которым можно начинать
+        :return: номера занятых ядер, не меньше minimum и не больше desired
+        """
+        desired = max(min(desired, len(self.cores)), 1)
+        minimum = max(min(minimum, desired), 1)
+        ticket = object()
+        async with self._changed:
+            self._waiters.append(ticket)
+            try:
+                await self._changed.wait_for(lambda: self._waiters[0] is ticket and len(self._free) >= minimum)
+                cores = sorted(self._free)[:desired]
+                self._free.difference_update(cores)
+            finally:
+                self._waiters.remove(ticket)
+                self._changed.notify_all()
+        return cores
+
+    async def release(self, cores: list[int]) -> None:
+        async with self._changed:
+            self._free.update(cores)
+            self._changed.notify_all()
+
+
+class SolverManager:
+
+    def __init__(
+            self,
+            cores: list[int],
+            launcher: str = "",
+            min_ranks: int = 1,
+            max_ranks: int = 0,
+            cost_per_rank: float = 0,
+            kill_grace: float = 10
+    ):
+        """
+        Запуск процессов решателя в пределах бюджета ядер
+
+        Количество рангов процесса выбирается по оценке трудоемкости задачи,
+        а количество одновременных процессов ограничено количеством ядер.
+        Каждый процесс запускается в собственной группе процессов, поэтому при
+        отмене или превышении времени завершается вместе со всеми потомками.
+
+        :param cores: номера ядер, выделенных решателю
+        :param launcher: шаблон команды запуска с подстановками {ranks} и {cpus},
+            например "mpirun -np {ranks} --cpu-set {cpus} --bind-to core"
+            (без шаблона решатель запускается напрямую одним процессом)
+        :param min_ranks: минимальное количество рангов процесса
+        :param max_ranks: максимальное количество рангов процесса (0 - все ядра)
+        :param cost_per_rank: трудоемкость, приходящаяся на один ранг
+        :param kill_grace: время в секундах между SIGTERM и SIGKILL
+        """
+        self._budget = CoreBudget(cores)
+        self._launcher = launcher
+        self._max_ranks = min(max_ranks or len(cores), len(cores)) if launcher else 1
+        self._min_ranks = min(max(min_ranks, 1), self._max_ranks)
+        self._cost_per_rank = cost_per_rank
+        self._kill_grace = kill_grace
+        self._processes: dict[TaskID, asyncio.subprocess.Process] = {}
+        self._ranks: dict[TaskID, int] = {}
+        self._waiting: dict[TaskID, asyncio.Task] = {}
+        self._cancelled: set[TaskID] = set()
+        self._jobs: set[asyncio.Task] = set()
+
+    def ranks(self, cost: float = None) -> int:
+        """
+        Желаемое количество рангов для задачи
+
+        :param cost: оценка трудоемкости (estimate_cost)
+        :return: количество рангов
+        """
+        if not cost or not self._cost_per_rank:
+            return self._max_ranks
+        return min(max(math.ceil(cost / self._cost_per_rank), self._min_ranks), self._max_ranks)
+
+    def command(self, args: list[str], cpus: list[int]) -> list[str]:
+        if not self._launcher:
+            return list(args)
+        launcher = self._launcher.format(ranks=len(cpus), cpus=",".join(map(str, cpus)))
+        return [*shlex.split(launcher), *args]
+
+    def submit(self, coro: Coroutine) -> asyncio.Task:
+        """
+        Запускает обработку задачи в фоне, не блокируя воркер
+
+        :param coro: корутина обработки
+        :return: asyncio задача
+        """
+        job = asyncio.create_task(coro)
+        self._jobs.add(job)
+        job.add_done_callback(self._done)
+        return job
+
+    def _done(self, job: asyncio.Task) -> None:
+        self._jobs.discard(job)
+        if not job.cancelled() and job.exception():
+            logging.error("[TomographyProc] Ошибка обработки задачи", exc_info=job.exception())
+
+    async def close(self) -> None:
+        """
+        Отменяет фоновые обработки, завершая их процессы
+        """
+        for job in self._jobs:
+            job.cancel()
+        await asyncio.gather(*self._jobs, return_exceptions=True)
+
+    async def run(
+            self,
+            task_id: TaskID,
+            args: list[str],
+            log_path: str,
+            timeout: float = None,
+            on_progress: Callable[[int], Awaitable[None]] = None,
+            cost: float = None
+    ) -> int:
+        """
+        Запускает процесс и дожидается его завершения
+
+        stdout и stderr процесса пишутся в лог, номера итераций из вывода
+        передаются в on_progress.
+
+        :param task_id: идентификатор задачи
+        :param args: команда и аргументы
+        :param log_path: путь к логу
+        :param timeout: ограничение времени выполнения в секундах (без ограничения, если не задано)
+        :param on_progress: вызывается при появлении в выводе новой итерации
+        :param cost: оценка трудоемкости (estimate_cost)
+        :return: код завершения процесса
+        :raises SolverCancelled: процесс отменен
+        :raises SolverTimeout: превышено время выполнения
+        """
+        if self.discard_cancelled(task_id):
+            raise SolverCancelled(f"Задача {task_id!r} отменена")
+
+        # Начинаем с освободившимися ядрами, если их не меньше минимума,
+        # вместо того чтобы ждать желаемого количества
+        self._waiting[task_id] = asyncio.current_task()
+        try:
+            cpus = await self._budget.acquire(self.ranks(cost), self._min_ranks)
+        except asyncio.CancelledError:
+            if task_id not in self._cancelled:
+                raise
+            asyncio.current_task().uncancel()
+            self._cancelled.discard(task_id)
+            raise SolverCancelled(f"Задача {task_id!r} отменена") from None
+        finally:
+            self._waiting.pop(task_id, None)
+
+        try:
+            command = self.command(args, cpus)
+            logging.info(f"[TomographyProc] Задача {task_id!r}: рангов {len(cpus)}, ядра {cpus}")
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=True
+            )
+            self._processes[task_id] = process
+            self._ranks[task_id] = len(cpus)
+            logging.info(f"[TomographyProc] Запущен процесс {process.pid} задачи {task_id!r}")
+            try:
+                # Отмена, пришедшая во время запуска процесса
+                if task_id in self._cancelled:
+                    await self._terminate(process)
+                async with asyncio.timeout(timeout):
+                    await self._stream(process, log_path, on_progress)
+                    returncode = await process.wait()
+            except TimeoutError:
+                await self._terminate(process)
+                raise SolverTimeout(f"Процесс задачи {task_id!r} превысил время выполнения {timeout} с") from None
+            except BaseException:
+                await self._terminate(process)
+                raise
+            finally:
+                self._processes.pop(task_id, None)
+                self._ranks.pop(task_id, None)
+        finally:
+            await self._budget.release(cpus)
+
+        if self.discard_cancelled(task_id):
+            raise SolverCancelled(f"Задача {task_id!r} отменена")
+        return returncode
+
+    async def cancel(self, task_id: TaskID) -> bool:
+        """
+        Отменяет запуск задачи
+
+        Если процесс уже запущен, его группа процессов завершается, если
+        ожидает ядра - ожидание прерывается, иначе задача будет отменена при
+        попытке запуска.
+
+        :param task_id: идентификатор задачи
+        :return: процесс был запущен и завершен
+        """
+        self._cancelled.add(task_id)
+        if task_id in self._waiting:
+            self._waiting[task_id].cancel()
+            return False
+        process = self._processes.get(task_id)
+        if process is None:
+            return False
+        await self._terminate(process)
+        return True
+
+    def discard_cancelled(self, task_id: TaskID) -> bool:
+        """
+        Проверяет, была ли задача отменена до запуска процесса, и снимает отметку
+
+        :param task_id: идентификатор задачи
+        :return: задача отменена
+        """
+        if task_id not in self._cancelled:
+            return False
+        self._cancelled.discard(task_id)
+        return True
+
+    async def _stream(
+            self,
+            process: asyncio.subprocess.Process,
+            log_path: str,
+            on_progress: Callable[[int], Awaitable[None]] = None
+    ) -> None:
+        # Вывод читается порциями, а не построчно: readline падает на строке
+        # длиннее лимита буфера потока. От незавершенной строки хранится
+        # только хвост, номер итерации ищется в завершенных строках
+        iteration = None
+        tail = b""
+        async with aiofiles.open(log_path, "wb") as log:
+            while True:
+                chunk = await process.stdout.read(STREAM_CHUNK)
+                if chunk:
+                    await log.write(chunk)
+                    *lines, tail = (tail + chunk).replace(b"\r", b"\n").split(b"\n")
+                    tail = tail[-STREAM_CHUNK:]
+                else:
+                    lines, tail = [tail], b""
+                for line in lines:
+                    match = ITERATION_PATTERN.search(line)
+                    if match and on_progress and int(match[1]) != iteration:
+                        iteration = int(match[1])
+                        await on_progress(iteration)
+                if not chunk:
+                    break
+
+    @staticmethod
+    def _signal(pid: int, sig: signal.Signals) -> None:
+        try:
+            os.killpg(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    async def _terminate(self, process: asyncio.subprocess.Process) -> None:
+        # Сигнал отправляется группе, даже если процесс уже завершился:
+        # оставшиеся потомки держат вывод открытым
+        self._signal(process.pid, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), self._kill_grace)
+        except TimeoutError:
+            self._signal(process.pid, signal.SIGKILL)
+            await process.wait()
+        logging.info(f"[TomographyProc] Процесс {process.pid} завершен")
+
+    def stats(self) -> dict:
+        return {
+            "cores": len(self._budget.cores),
+            "free_cores": self._budget.free,
+            "waiting": len(self._waiting),
+            "running": {str(task_id): ranks for task_id, ranks in self._ranks.items()},
+        }
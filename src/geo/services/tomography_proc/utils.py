@@ -1,3 +1,9 @@
+import hashlib
+import logging
+import os
+import shutil
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 from scipy.ndimage import gaussian_filter, zoom
@@ -6,33 +12,137 @@ from matplotlib.colors import ListedColormap
 import pyvista as pv
 
 
-def relief_read(path_relief, grid_size):
+# Область рельефа по умолчанию: x_min, x_max, y_min, y_max
+# (в файле рельефа x - широта, y - долгота)
+RELIEF_BBOX = (71.1, 73.5, 125, 128)
+
+
+def task_bbox(
+        seisdata,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        margin: float
+) -> tuple[float, float, float, float]:
+    """
+    Область рельефа задачи
+
+    Объединение границ, заданных при загрузке данных, и охвата станций и
+    событий с отступом: станции вне границ загрузки событий тоже попадают
+    в сетку. Если какая-то из сторон не задана ни границами, ни данными,
+    берется область по умолчанию.
+
+    :param seisdata: параметры загрузки данных задачи
+    :param latitudes: широты станций и событий
+    :param longitudes: долготы станций и событий
+    :param margin: отступ в градусах
+    :return: область (x_min, x_max, y_min, y_max) в осях файла рельефа
+    """
+    sides = [[], [], [], []]
+    if seisdata is not None:
+        bounds = (seisdata.min_latitude, seisdata.max_latitude, seisdata.min_longitude, seisdata.max_longitude)
+        for side, value in zip(sides, bounds):
+            if value is not None:
+                side.append(float(value))
+    if len(latitudes) and len(longitudes):
+        extent = (np.min(latitudes), np.max(latitudes), np.min(longitudes), np.max(longitudes))
+        for side, value in zip(sides, extent):
+            side.append(float(value))
+    if not all(sides):
+        return RELIEF_BBOX
+    return (
+        min(sides[0]) - margin,
+        max(sides[1]) + margin,
+        min(sides[2]) - margin,
+        max(sides[3]) + margin
+    )
+
+
+def relief_convert(path_relief: str) -> tuple[str, str]:
+    """
+    Преобразует текстовый рельеф (строки "y x z") в регулярную сетку
+
+    Сетка сохраняется рядом с исходным файлом в .grid.npy (z[y, x], читается
+    через mmap), оси и время изменения источника - в .axes.npz. Повторное
+    преобразование выполняется только после изменения исходного файла.
+    Строки сетки идут по y, поэтому область читается только из строк,
+    попадающих в ее диапазон y.
+
+    :param path_relief: путь к текстовому файлу рельефа
+    :return: пути к файлу сетки и файлу осей
+    """
+    root = os.path.splitext(path_relief)[0]
+    grid_path, axes_path = f"{root}.grid.npy", f"{root}.axes.npz"
+    mtime = os.stat(path_relief).st_mtime_ns
+    if os.path.exists(axes_path) and os.path.exists(grid_path):
+        with np.load(axes_path) as axes:
+            if int(axes["mtime"]) == mtime:
+                return grid_path, axes_path
+
+    logging.info(f"[TomographyProc] Преобразование рельефа {path_relief!r}")
     relief = pd.read_csv(path_relief, sep=r"\s+", names=['y', 'x', 'z'])
+    y_axis, y_index = np.unique(relief['y'].to_numpy(), return_inverse=True)
+    x_axis, x_index = np.unique(relief['x'].to_numpy(), return_inverse=True)
+    grid = np.full((len(y_axis), len(x_axis)), np.nan)
+    grid[y_index, x_index] = relief['z'].to_numpy()
+
+    # Файл осей записывается последним и служит признаком готовой сетки
+    for path, save in (
+            (grid_path, lambda file: np.save(file, grid)),
+            (axes_path, lambda file: np.savez(file, x=x_axis, y=y_axis, mtime=mtime)),
+    ):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            save(file)
+        os.replace(tmp_path, path)
+    return grid_path, axes_path
+
+
+def relief_read(path_relief, grid_size, bbox=RELIEF_BBOX):
+    """
+    Читает рельеф области и приводит его к размеру сетки
+
+    Результат кэшируется в памяти процесса по времени изменения файла,
+    области и размеру сетки.
+
+    :param path_relief: путь к текстовому файлу рельефа
+    :param grid_size: размер сетки
+    :param bbox: область (x_min, x_max, y_min, y_max)
+    :return: x_middle, y_middle, рельеф на сетке, границы области в координатах ST3D
+    """
+    mtime = os.stat(path_relief).st_mtime_ns
+    x_middle, y_middle, depth_topography, X_Y_Z = _relief_read(
+        path_relief, mtime, tuple(bbox), tuple(grid_size)
+    )
+    return x_middle, y_middle, depth_topography.copy(), X_Y_Z.copy()
 
-    # Todo: значения по умолчанию или введенные пользователем
-    relief = relief.drop(relief[relief.y > 128].index)
-    relief = relief.drop(relief[relief.y < 125].index)
-    relief = relief.drop(relief[relief.x > 73.5].index)
-    relief = relief.drop(relief[relief.x < 71.1].index)
 
-    relief = relief.sort_values(['y', 'x'])
+@lru_cache(maxsize=16)
+def _relief_read(path_relief, mtime, bbox, grid_size):
+    grid_path, axes_path = relief_convert(path_relief)
+    with np.load(axes_path) as axes:
+        x_axis, y_axis = axes["x"], axes["y"]
+    grid = np.load(grid_path, mmap_mode="r")
 
-    x_array = np.array(relief['x'])
-    y_array = np.array(relief['y'])
+    x_min, x_max, y_min, y_max = bbox
+    x_slice = slice(np.searchsorted(x_axis, x_min, "left"), np.searchsorted(x_axis, x_max, "right"))
+    y_slice = slice(np.searchsorted(y_axis, y_min, "left"), np.searchsorted(y_axis, y_max, "right"))
 
-    x_coords = list(set(x_array))
-    y_coords = list(set(y_array))
+    x_coords = x_axis[x_slice]
+    y_coords = y_axis[y_slice]
+    if not len(x_coords) or not len(y_coords):
+        raise ValueError(f"Область {bbox} не пересекается с рельефом {path_relief!r}")
 
     x_max = np.max(x_coords)
     x_min = np.min(x_coords)
     y_max = np.max(y_coords)
     y_min = np.min(y_coords)
-    print(x_min, x_max, y_min, y_max)
+    logging.debug(f"[TomographyProc] Границы рельефа: x {x_min} - {x_max}, y {y_min} - {y_max}")
 
     x_middle = x_min + np.abs(x_min - x_max) / 2
     y_middle = y_min + np.abs(y_min - y_max) / 2
 
-    z_coords = np.asarray(relief['z']).reshape(len(x_coords), len(y_coords)) / 1000
+    # Значения упорядочены по (y, x), как в исходной реализации через сортировку таблицы
+    z_coords = np.asarray(grid[y_slice, x_slice]).reshape(len(x_coords), len(y_coords)) / 1000
 
     depth_topography = zoom(z_coords,
                             (grid_size[0] / z_coords.shape[0],
@@ -79,6 +189,200 @@ def create_start_model(data: list[list[float]], grid_size):
     return Vp_st, Vs_st
 
 
+def save_start_model(data: list[list[float]], grid_size, path: str) -> str:
+    """
+    Строит стартовую модель и сохраняет ее одним .npy файлом [Vp, Vs]
+
+    :param data: одномерная модель
+    :param grid_size: размер сетки
+    :param path: путь к файлу
+    :return: путь к файлу
+    """
+    np.save(path, np.stack(create_start_model(data, grid_size)))
+    return path
+
+
+def input_attrs(data) -> dict[str, np.ndarray]:
+    """
+    Атрибуты группы HPS_ST3D/Input, задаваемые параметрами томографии
+
+    :param data: параметры томографии
+    :return: {атрибут: значение}
+    """
+    return {
+        "IterMax": np.array([data.iter_max], dtype=np.int64),
+        "IterResidLimits": np.full(np.int64(data.iter_max), 1.5, dtype=np.float64),
+        "LinSysLSQRIterMax": np.array([data.lin_sys_LSQR_iter_max], dtype=np.int64),
+        "ParamType": np.array([2], dtype=np.uint8),
+        "SrcsPsvRelocLimit": np.array([40, 40, 40], dtype=np.float64),
+        "TomoGridRotAngles": np.array([0, 22.5, 45, 67.5], dtype=np.float64),
+        "TomoGridStep": np.array(data.grid_step, dtype=np.float64),
+
+        "TomoMatDampingP": np.asarray([data.mat_damping_P], dtype=np.float64),
+        "TomoMatDampingP4V": np.asarray([data.mat_damping_P4V], dtype=np.float64),
+        "TomoMatDampingS": np.asarray([data.mat_damping_S], dtype=np.float64),
+        "TomoMatDampingS4V": np.asarray([data.mat_damping_S4V], dtype=np.float64),
+        "TomoMatSmoothHP": np.asarray([data.mat_damping_HP], dtype=np.float64),
+        "TomoMatSmoothHP4V": np.asarray([data.mat_damping_HP4V], dtype=np.float64),
+        "TomoMatSmoothHS": np.asarray([data.mat_damping_HS], dtype=np.float64),
+        "TomoMatSmoothHS4V": np.asarray([data.mat_damping_HS4V], dtype=np.float64),
+        "TomoMatSmoothVP": np.asarray([data.mat_damping_VP], dtype=np.float64),
+        "TomoMatSmoothVP4V": np.asarray([data.mat_damping_VP4V], dtype=np.float64),
+        "TomoMatSmoothVS": np.asarray([data.mat_damping_VS], dtype=np.float64),
+        "TomoMatSmoothVS4V": np.asarray([data.mat_damping_VS4V], dtype=np.float64),
+
+        # Атрибуты "VLimitsP" и "VLimitsS"
+        "VLimitsP": np.array(data.v_limits_p, dtype=np.float64),
+        "VLimitsS": np.array(data.v_limits_s, dtype=np.float64),
+    }
+
+
+def patch_input(source: str, path: str, attrs: dict[str, np.ndarray]) -> str:
+    """
+    Копирует входной файл, заменяя атрибуты группы HPS_ST3D/Input
+
+    :param source: исходный входной файл
+    :param path: новый входной файл
+    :param attrs: заменяемые атрибуты
+    :return: путь к новому файлу
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    shutil.copyfile(source, path)
+    with h5py.File(path, "r+") as file:
+        group_input = file["HPS_ST3D"]["Input"]
+        for name, value in attrs.items():
+            group_input.attrs[name] = value
+    return path
+
+
+def _rms(value) -> float | None:
+    value = np.asarray(value)
+    if not value.size or not np.issubdtype(value.dtype, np.number):
+        return None
+    return float(np.sqrt(np.mean(np.square(value, dtype=np.float64))))
+
+
+def residual_summary(path: str) -> dict[str, float | int | None]:
+    """
+    Сводка невязок последней итерации выходного файла HPS_ST3D
+
+    Берутся все атрибуты и датасеты группы последней итерации, в имени
+    которых есть "Resid", и для каждого считается среднеквадратичное значение.
+
+    :param path: путь к выходному файлу
+    :return: {"iterations": количество итераций, путь: RMS, ...}
+    """
+    with h5py.File(path, "r") as file:
+        root = file["HPS_ST3D"]
+        iterations = sorted(
+            (name for name in root if name.startswith("Iter_") and name[5:].isdigit()),
+            key=lambda name: int(name[5:])
+        )
+        summary = {"iterations": len(iterations)}
+        if not iterations:
+            return summary
+
+        last = root[iterations[-1]]
+
+        def collect(name: str, obj) -> None:
+            for key, value in obj.attrs.items():
+                if "resid" in key.lower():
+                    summary[f"{name}@{key}" if name else key] = _rms(value)
+            if isinstance(obj, h5py.Dataset) and "resid" in name.rsplit("/", 1)[-1].lower():
+                summary[name] = _rms(obj[()])
+
+        collect("", last)
+        last.visititems(collect)
+    return summary
+
+
+@lru_cache(maxsize=4)
+def _file_digest(path: str, mtime: float, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def solver_digest(executable: str) -> str:
+    """
+    Версия решателя - хэш его исполняемого файла
+
+    :param executable: путь или имя исполняемого файла
+    :return: хэш файла или само имя, если файл не найден
+    """
+    path = shutil.which(executable) or executable
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return executable
+    return _file_digest(os.path.realpath(path), stat.st_mtime, stat.st_size)
+
+
+def _update_attrs(digest, obj) -> None:
+    for key in sorted(obj.attrs):
+        value = np.ascontiguousarray(obj.attrs[key])
+        digest.update(f"@{key}:{value.dtype.str}:{value.shape}".encode())
+        digest.update(value.tobytes())
+
+
+def _dataset_digest(dataset) -> str:
+    value = np.ascontiguousarray(dataset[()])
+    digest = hashlib.sha256(f"{value.dtype.str}:{value.shape}".encode())
+    digest.update(value.tobytes())
+    return digest.hexdigest()
+
+
+def dataset_digests(path: str) -> dict[str, str]:
+    """
+    Хэши датасетов входного файла HPS_ST3D
+
+    :param path: путь к входному файлу
+    :return: {имя датасета: хэш}
+    """
+    digests = {}
+
+    def collect(name: str, obj) -> None:
+        if isinstance(obj, h5py.Dataset):
+            digests[name] = _dataset_digest(obj)
+
+    with h5py.File(path, "r") as file:
+        file.visititems(collect)
+    return digests
+
+
+def input_hash(path: str, executable: str, datasets: dict[str, str] = None) -> str:
+    """
+    Канонический хэш входного файла HPS_ST3D
+
+    Группы, датасеты и атрибуты обходятся в порядке имен, поэтому хэш не
+    зависит от порядка их создания и служебных данных HDF5. Датасеты входят
+    в хэш своими хэшами: для файлов, отличающихся только атрибутами, их
+    можно посчитать один раз (dataset_digests).
+
+    :param path: путь к входному файлу
+    :param executable: исполняемый файл решателя
+    :param datasets: готовые хэши датасетов файла {имя датасета: хэш}
+    :return: хэш
+    """
+    datasets = datasets or {}
+    digest = hashlib.sha256(solver_digest(executable).encode())
+    with h5py.File(path, "r") as file:
+        names = []
+        file.visit(names.append)
+        _update_attrs(digest, file)
+        for name in sorted(names):
+            obj = file[name]
+            if isinstance(obj, h5py.Dataset):
+                value = datasets.get(name) or _dataset_digest(obj)
+                digest.update(f"D{name}:{value}".encode())
+            else:
+                digest.update(f"G{name}".encode())
+            _update_attrs(digest, obj)
+    return digest.hexdigest()
+
+
 def change_coords_to_ST3D(FI, TET, h, fi0, tet0):
     PI = 3.1415926
     Rz = 6371.0
@@ -1,22 +1,225 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+import aiofiles
 import httpx
 
+from geo.utils.retry import RetryPolicy, RequestStats
+
+
+@dataclass
+class DownloadResult:
+    status_code: int
+    size: int
+    elapsed: float
+    headers_elapsed: float = 0
+    hedged: bool = False
+    hedge_won: bool = False
+    content: bytes | None = None
+
+    @property
+    def is_success(self) -> bool:
+        return 200 <= self.status_code < 300
+
 
 class HttpProcessor:
 
-    def __init__(self, timeout: int = 1, user_agent: str = None):
+    def __init__(
+            self,
+            connect_timeout: float = 10,
+            read_timeout: float = 600,
+            max_connections: int = 10,
+            max_keepalive_connections: int = 5,
+            keepalive_expiry: float = 30,
+            http2: bool = False,
+            user_agent: str = None,
+            chunk_size: int = 1024 * 1024,
+            retry_policy: RetryPolicy = None
+    ):
+        """
+        Долгоживущий HTTP клиент с общим пулом соединений
+
+        Клиент создается в start() и закрывается в close(), поэтому
+        соединения к одному хосту переиспользуются между запросами и задачами.
+
+        :param connect_timeout: таймаут установки соединения в секундах
+        :param read_timeout: таймаут чтения (записи, ожидания пула) в секундах
+        :param max_connections: максимальное количество соединений в пуле
+        :param max_keepalive_connections: количество удерживаемых keep-alive соединений
+        :param keepalive_expiry: время жизни простаивающего соединения в секундах
+        :param http2: использовать HTTP/2 (требуется пакет h2)
+        :param user_agent:
+        :param chunk_size: размер части при потоковой загрузке в байтах
+        :param retry_policy: политика повторов запросов
+        """
         if not user_agent:
             user_agent = "aiohttp/3.7.4"
 
-        self.client = None
-        self.timeout = timeout
+        if http2 and not importlib.util.find_spec("h2"):
+            logging.warning("[HttpProcessor] Пакет h2 не установлен, HTTP/2 отключен")
+            http2 = False
+
+        self.client: httpx.AsyncClient | None = None
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
         self.user_agent = user_agent
+        self.chunk_size = chunk_size
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.stats = RequestStats()
+
+    async def start(self) -> None:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                headers={"User-Agent": self.user_agent}
+            )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
 
-    async def __aenter__(self):
-        self.client = await httpx.AsyncClient(
-            timeout=self.timeout,
-            headers={"User-Agent": self.user_agent}
-        ).__aenter__()
+    async def __aenter__(self) -> httpx.AsyncClient:
+        if self.client is None:
+            raise RuntimeError("HttpProcessor не запущен")
         return self.client
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.__aexit__(exc_type, exc_val, exc_tb)
+        # Клиент общий для всех запросов и закрывается в close()
+        pass
+
+    async def download(
+            self,
+            url: str,
+            filepath: str,
+            params: dict = None,
+            headers_received: asyncio.Event = None,
+            spill_size: int = None
+    ) -> DownloadResult:
+        """
+        Потоково сохраняет тело ответа в файл
+
+        Тело пишется по частям по мере получения и не декодируется в строку,
+        поэтому потребление памяти не зависит от размера ответа.
+        При неуспешном статусе файл не изменяется.
+
+        Если задан spill_size, тело накапливается в памяти и возвращается в
+        content, а файл создается только когда тело превышает spill_size байт.
+
+        :param url:
+        :param filepath: путь к файлу назначения
+        :param params: query параметры
+        :param headers_received: событие, устанавливаемое при получении заголовков ответа
+        :param spill_size: максимальный размер тела в памяти в байтах
+        :return: статус, размер тела в байтах, время загрузки и время до заголовков в секундах
+        """
+        started = time.monotonic()
+        size = 0
+        async with self as client:
+            async with client.stream("GET", url, params=params) as response:
+                headers_elapsed = time.monotonic() - started
+                if headers_received is not None:
+                    headers_received.set()
+                content = None
+                if response.is_success:
+                    file = await aiofiles.open(filepath, "wb") if spill_size is None else None
+                    buffer = bytearray()
+                    try:
+                        async for chunk in response.aiter_bytes(self.chunk_size):
+                            size += len(chunk)
+                            if file is None and size <= spill_size:
+                                buffer += chunk
+                                continue
+                            if file is None:
+                                file = await aiofiles.open(filepath, "wb")
+                                await file.write(buffer)
+                                buffer.clear()
+                            await file.write(chunk)
+                    finally:
+                        if file is not None:
+                            await file.close()
+                    if file is None:
+                        content = bytes(buffer)
+                return DownloadResult(
+                    status_code=response.status_code,
+                    size=size,
+                    elapsed=time.monotonic() - started,
+                    headers_elapsed=headers_elapsed,
+                    content=content
+                )
+
+    async def download_hedged(
+            self,
+            url: str,
+            filepath: str,
+            params: dict = None,
+            hedge_after: float = None,
+            spill_size: int = None
+    ) -> DownloadResult:
+        """
+        Загрузка с дублирующим запросом
+
+        Если заголовки ответа не получены за hedge_after секунд, отправляется
+        второй такой же запрос во временный файл. Результатом становится первый
+        успешно завершенный запрос, второй отменяется.
+
+        :param url:
+        :param filepath: путь к файлу назначения
+        :param params: query параметры
+        :param hedge_after: задержка дублирующего запроса в секундах (без дубля, если не задана)
+        :param spill_size: максимальный размер тела в памяти в байтах
+        :return: результат загрузки
+        """
+        if hedge_after is None:
+            return await self.download(url, filepath, params, spill_size=spill_size)
+
+        headers_received = asyncio.Event()
+        primary = asyncio.create_task(self.download(url, filepath, params, headers_received, spill_size))
+        waiter = asyncio.create_task(headers_received.wait())
+        try:
+            await asyncio.wait({primary, waiter}, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        if headers_received.is_set() or primary.done():
+            return await primary
+
+        hedge_path = f"{filepath}.hedge"
+        hedge = asyncio.create_task(self.download(url, hedge_path, params, spill_size=spill_size))
+        pending = {primary, hedge}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.exception() and task.result().is_success:
+                        winner = task
+                        break
+                else:
+                    if not pending:
+                        winner = done.pop()
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+            await asyncio.gather(primary, hedge, return_exceptions=True)
+
+        try:
+            result = await winner
+            result.hedged = True
+            result.hedge_won = winner is hedge
+            if result.hedge_won and result.is_success and result.content is None:
+                os.replace(hedge_path, filepath)
+            return result
+        finally:
+            if os.path.exists(hedge_path):
+                os.remove(hedge_path)
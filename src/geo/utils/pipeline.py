@@ -0,0 +1,90 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+class StageStats:
+
+    def __init__(self):
+        self.items = 0
+        self.busy = 0.0
+
+    @contextmanager
+    def measure(self, items: int = 1) -> Iterator[None]:
+        """
+        Учитывает время обработки элементов стадией
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.busy += time.monotonic() - started
+        self.items += items
+
+    def stats(self) -> dict:
+        return {
+            "items": self.items,
+            "busy": round(self.busy, 3),
+            "throughput": round(self.items / self.busy, 3) if self.busy else None,
+        }
+
+
+class MeteredQueue(asyncio.Queue):
+
+    def __init__(self, maxsize: int = 0):
+        """
+        Очередь между стадиями с учетом глубины и ожидания
+
+        :param maxsize: максимальное количество элементов, при заполнении
+            производитель ждет потребителя
+        """
+        super().__init__(maxsize)
+        self.peak = 0
+        self.blocked = 0.0
+
+    async def put(self, item: Any) -> None:
+        started = time.monotonic()
+        await super().put(item)
+        self.blocked += time.monotonic() - started
+        self.peak = max(self.peak, self.qsize())
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.qsize(),
+            "peak": self.peak,
+            "maxsize": self.maxsize,
+            "blocked": round(self.blocked, 3),
+        }
+
+
+class PipelineStats:
+
+    def __init__(self, stages: list[str]):
+        """
+        Статистика конвейера: суммарная по стадиям и текущая по очередям
+
+        :param stages: имена стадий
+        """
+        self._stages = {name: StageStats() for name in stages}
+        self._queues: dict[str, MeteredQueue] = {}
+
+    def stage(self, name: str) -> StageStats:
+        return self._stages[name]
+
+    def queue(self, name: str, maxsize: int) -> MeteredQueue:
+        """
+        Создает очередь для очередного запуска конвейера
+
+        :param name: имя очереди
+        :param maxsize: размер очереди
+        :return: очередь
+        """
+        self._queues[name] = MeteredQueue(maxsize)
+        return self._queues[name]
+
+    def stats(self) -> dict:
+        return {
+            "stages": {name: stage.stats() for name, stage in self._stages.items()},
+            "queues": {name: queue.stats() for name, queue in self._queues.items()},
+        }
@@ -0,0 +1,47 @@
+import importlib
+import logging
+import os
+
+from aiomultiprocess import Pool
+
+PRELOAD_MODULES = (
+    "numpy",
+    "scipy.ndimage",
+    "h5py",
+    "obspy",
+    "geo.services.data_proc.utils",
+    "geo.services.tomography_proc.utils",
+)
+
+
+def preload(modules: tuple[str, ...]) -> None:
+    """
+    Импортирует тяжелые модули в дочернем процессе один раз при его запуске
+    """
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError as error:
+            logging.warning(f"[ProcessPool] Не удалось загрузить модуль {module!r}: {error!r}")
+
+
+def create_process_pool(processes: int = None, max_tasks_per_child: int = 0) -> Pool:
+    """
+    Создает пул процессов для CPU задач
+
+    Каждый процесс выполняет одну задачу за раз, поэтому количество процессов
+    ограничивает количество одновременно выполняемых задач.
+
+    :param processes: количество процессов (по умолчанию по количеству ядер)
+    :param max_tasks_per_child: количество задач до перезапуска процесса (0 - без перезапуска)
+    :return: пул процессов
+    """
+    pool = Pool(
+        processes=processes or os.cpu_count(),
+        initializer=preload,
+        initargs=(PRELOAD_MODULES,),
+        maxtasksperchild=max_tasks_per_child,
+        childconcurrency=1,
+    )
+    logging.info(f"[ProcessPool] Запущен пул из {pool.process_count} процессов")
+    return pool
@@ -11,5 +11,15 @@ class Queue:
     def dequeue(self) -> Any | None:
         return self._data.pop(0) if self._data else None
 
+    def remove(self, item: Any) -> bool:
+        try:
+            self._data.remove(item)
+        except ValueError:
+            return False
+        return True
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self._data
+
     def is_empty(self) -> bool:
         return not bool(self._data)
@@ -0,0 +1,86 @@
+import random
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Политика повторов запросов
+
+    :param attempts: максимальное количество попыток
+    :param base_delay: базовая задержка перед повтором в секундах
+    :param max_delay: максимальная задержка перед повтором в секундах
+    :param deadline: общее ограничение времени запроса со всеми повторами в секундах
+    :param hedge: отправлять дублирующий запрос, если заголовки ответа задерживаются
+    :param hedge_quantile: квантиль времени до заголовков, после которого отправляется дубль
+    :param hedge_min_samples: минимальное количество замеров для расчета задержки дубля
+    :param retry_statuses: статусы ответа, при которых запрос повторяется
+    """
+    attempts: int = 3
+    base_delay: float = 1
+    max_delay: float = 30
+    deadline: float | None = None
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Задержка перед повтором: экспоненциальный рост с полным джиттером
+
+        :param attempt: номер повтора, начиная с 0
+        :return: задержка в секундах
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class EndpointStats:
+
+    def __init__(self, window: int):
+        self.latency: deque[float] = deque(maxlen=window)
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def quantile(self, q: float, min_samples: int = 1) -> float | None:
+        if len(self.latency) < max(min_samples, 1):
+            return None
+        return float(np.quantile(np.fromiter(self.latency, dtype=float), q))
+
+    def stats(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "samples": len(self.latency),
+            "latency_p50": self.quantile(0.5),
+            "latency_p95": self.quantile(0.95),
+        }
+
+
+class RequestStats:
+
+    def __init__(self, window: int = 1000):
+        """
+        Статистика запросов по эндпоинтам
+
+        :param window: количество последних замеров времени до заголовков ответа
+        """
+        self._window = window
+        self._endpoints: dict[str, EndpointStats] = {}
+
+    def endpoint(self, key: str) -> EndpointStats:
+        if key not in self._endpoints:
+            self._endpoints[key] = EndpointStats(self._window)
+        return self._endpoints[key]
+
+    def stats(self) -> dict:
+        return {key: endpoint.stats() for key, endpoint in self._endpoints.items()}
@@ -10,3 +10,5 @@ from .seisdata import SeisDataResponse
 from .event import EventsResponse
 
 from .station import StationsResponse
+
+from .sweep import SweepResponse
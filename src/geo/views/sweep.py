@@ -0,0 +1,6 @@
+from .base import BaseView
+from geo.models import schemas
+
+
+class SweepResponse(BaseView):
+    content: schemas.Sweep
@@ -3,4 +3,4 @@ from geo.models import schemas
 
 
 class TomographyResponse(BaseView):
-    content: schemas.Tomography
+    content: schemas.TomographyResult
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+from obspy import read_inventory
+
+from geo.services.data_proc.utils import (
+    STATION_DTYPE,
+    quake,
+    rename_station,
+    station_sort_key,
+    stations,
+    to_records,
+)
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+CATALOG = os.path.join(DATA, "catalog.xml")
+STATIONS = os.path.join(DATA, "stations.txt")
+
+
+def stations_obspy(path: str) -> np.ndarray:
+    """
+    Станции из того же ответа, разобранного obspy: последняя эпоха каждой станции
+    """
+    latest = {}
+    for network in read_inventory(path, format="STATIONTXT"):
+        for station in network:
+            key = (network.code, station.code)
+            if key not in latest or latest[key].start_date < station.start_date:
+                latest[key] = station
+    rows = sorted(
+        (
+            (rename_station(code), network, station.longitude, station.latitude, station.elevation / 1000)
+            for (network, code), station in latest.items()
+        ),
+        key=lambda row: (station_sort_key(row[0]), row[1])
+    )
+    return to_records(STATION_DTYPE, {
+        name: [row[index] for row in rows]
+        for index, name in enumerate(("station", "network", "x", "y", "z"))
+    })
+
+
+def test_quakeml_stream_matches_obspy():
+    expected = quake([CATALOG], parser="obspy")
+    actual = quake([CATALOG], parser="stream")
+    assert len(expected[0]) and len(expected[1])
+    for expected_array, actual_array in zip(expected, actual):
+        assert expected_array.dtype == actual_array.dtype
+        assert np.array_equal(expected_array, actual_array)
+
+
+def test_quakeml_from_memory_matches_file():
+    with open(CATALOG, "rb") as file:
+        content = file.read()
+    for expected_array, actual_array in zip(quake([CATALOG]), quake([content])):
+        assert np.array_equal(expected_array, actual_array)
+
+
+def test_stations_match_obspy():
+    expected = stations_obspy(STATIONS)
+    actual = stations(STATIONS)
+    assert actual.dtype == expected.dtype
+    assert np.array_equal(actual, expected)
+    assert actual["station"].tolist() == ["1", "2", "2", "8", "10", "TIK"]
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import uuid
+
+from geo.services.tomography_proc.solver import ITERATION_PATTERN, SolverManager
+
+LOG = os.path.join(os.path.dirname(__file__), "data", "hps_st3d.log")
+
+
+def iterations(lines: list[bytes]) -> list[int]:
+    return [int(match[1]) for line in lines if (match := ITERATION_PATTERN.search(line))]
+
+
+def test_iteration_pattern_log():
+    with open(LOG, "rb") as file:
+        assert iterations(file.read().splitlines()) == [1, 1, 1, 2, 2, 2, 3, 3, 3]
+
+
+def test_iteration_pattern_forms():
+    assert iterations([b"Iter_2", b"Iter 3", b"Iteration: 4", b"ITER=5", b"iter #6"]) == [2, 3, 4, 5, 6]
+    assert iterations([b"IterMax = 10", b"Iterations: 10", b"iter_max = 10", b"LinSysLSQRIterMax = 100"]) == []
+
+
+def test_progress_from_log(tmp_path):
+    seen = []
+
+    async def on_progress(iteration: int) -> None:
+        seen.append(iteration)
+
+    async def run() -> int:
+        solver = SolverManager([0])
+        return await solver.run(uuid.uuid4(), ["cat", LOG], str(tmp_path / "solver.log"), on_progress=on_progress)
+
+    assert asyncio.run(run()) == 0
+    assert seen == [1, 2, 3]
+    with open(LOG, "rb") as expected:
+        assert (tmp_path / "solver.log").read_bytes() == expected.read()
+
+
+def test_progress_long_line(tmp_path):
+    script = tmp_path / "solver.sh"
+    script.write_text(f"#!/bin/sh\nhead -c 200000 /dev/zero | tr '\\\\0' x\nprintf 'Iter_1\\rIter_2\\n'\ncat {LOG}\n")
+    script.chmod(0o755)
+    seen = []
+
+    async def on_progress(iteration: int) -> None:
+        seen.append(iteration)
+
+    async def run() -> int:
+        solver = SolverManager([0])
+        return await solver.run(uuid.uuid4(), [str(script)], str(tmp_path / "solver.log"), on_progress=on_progress)
+
+    assert asyncio.run(run()) == 0
+    assert seen == [1, 2, 1, 2, 3]